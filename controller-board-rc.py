@@ -37,8 +37,17 @@ if stationrc.bbb.on_bbb():
     data = controller.run_command(args.command, read_response = True)
     print_data(data, args)
     controller.shut_down()
+elif len(args.hosts) == 1:
+    station = stationrc.remote_control.VirtualStation(host=args.hosts[0])
+    data = station.rc.send_command("controller-board", args.command)
+    print_data(data, args)
 else:
-    for host in args.hosts:
-        station = stationrc.remote_control.VirtualStation(host=host)
-        data = station.rc.send_command("controller-board", args.command)
-        print_data(data, args)
+    # send the command to all stations in parallel
+    fleet = stationrc.remote_control.StationFleet(hosts=args.hosts)
+    results = fleet.run(lambda station: station.rc.send_command("controller-board", args.command))
+    for host, res in results.items():
+        print(f"{host} ({res['status']}):")
+        if res["status"] == "OK":
+            print_data(res["data"], args)
+        elif res["data"] is not None:
+            print(f"   {res['data']}")
@@ -0,0 +1,52 @@
+import argparse
+import datetime
+
+import stationrc.common
+import stationrc.remote_control
+
+
+queries = {
+    "revision": lambda station: station.radiant_revision(),
+    "sample rate (MHz)": lambda station: station.radiant_sample_rate(),
+    "uptime": lambda station: str(datetime.timedelta(
+        milliseconds=station.radiant_low_level_interface.board_manager_uptime())),
+    "voltages": lambda station: station.radiant_low_level_interface.board_manager_voltage_readback(),
+}
+
+parser = argparse.ArgumentParser(
+    description="Query the status of several stations in parallel.")
+
+parser.add_argument(
+    "--host", "--hosts",
+    dest="hosts",
+    type=str, default=None,
+    nargs="+",
+    help="Specify ip addresses or aliases of the hosts. If `None`, use all stations in "
+         "`stationrc/remote_control/utils.py:host_aliases`.")
+
+parser.add_argument(
+    "-t", "--timeout",
+    type=float, default=60,
+    help="Timeout per station in seconds. (Default: 60 s)")
+
+parser.add_argument(
+    "--controller-board",
+    action="store_true",
+    help="Also print the latest monitoring of the controller board")
+
+parser.add_argument(
+    "--json",
+    action="store_true",
+    help="Print the results as JSON document instead of a table")
+
+args = parser.parse_args()
+
+stationrc.common.setup_logging()
+
+if args.controller_board:
+    # sampled by the station, does not access the controller board
+    queries["controller board"] = lambda station: station.get_controller_board_monitoring_latest()
+
+fleet = stationrc.remote_control.StationFleet(hosts=args.hosts, timeout=args.timeout)
+results = fleet.run(queries)
+stationrc.remote_control.print_fleet_results(results, as_json=args.json)
@@ -66,6 +66,15 @@ parser.add_argument(
     action="store_true"
 )
 
+parser.add_argument(
+    "--strategy",
+    type=str,
+    choices=["heuristic", "secant"],
+    default="heuristic",
+    help="Strategy to determine the register steps for the seam / slow tuning. \"secant\" estimates "
+    "the steps from the response to the previous steps. Default: heuristic",
+)
+
 parser.add_argument(
     "--exclude_channels",
     type=int,
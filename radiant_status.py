@@ -5,99 +5,114 @@ import stationrc.radiant
 import stationrc.remote_control
 
 
-def print_dict(d, prefix="   "):
-    for key in d.keys():
-        print(f"{prefix}{key}: {d[key]}")
+def format_dict(d, prefix="   "):
+    return [f"{prefix}{key}: {d[key]}" for key in d.keys()]
 
-import argparse
-
-parser = argparse.ArgumentParser()
-
-parser.add_argument(
-    "-c", "--channels",
-    action="store_true",
-    help="Print some results per channel"
-)
-
-parser.add_argument(
-    "--host", "--hosts",
-    dest="hosts",
-    type=str, default=[None],
-    nargs="+",
-    help="Specify ip address of host. If `None`, use ip from config in stationrc.")
 
-args = parser.parse_args()
+def radiant_status(station, channels=False):
+    lines = []
+    lines.append(f"RADIANT Revision: {station.radiant_revision()}")
 
-stationrc.common.setup_logging()
-
-for host in args.hosts:
-    station = stationrc.remote_control.VirtualStation(host=host)
-
-    print(f"RADIANT Revision: {station.radiant_revision()}")
+    lines.append(f"MCU UID: {station.get_radiant_board_mcu_uid():032x}")
 
-    print(f"MCU UID: {station.get_radiant_board_mcu_uid():032x}")
+    lines.append(f"DNA: {station.get_radiant_board_dna():016x}")
 
-    print(f"DNA: {station.get_radiant_board_dna():016x}")
-
-    print(f"Sample rate: {station.radiant_sample_rate()} MHz")
+    lines.append(f"Sample rate: {station.radiant_sample_rate()} MHz")
 
     board_manager_id = stationrc.radiant.register_to_string(
         station.radiant_low_level_interface.read_register("BM_ID")
     )
-    print(f"Board Manager ID: {board_manager_id}")
-    print(
+    lines.append(f"Board Manager ID: {board_manager_id}")
+    lines.append(
         f"Board Manager uptime: {datetime.timedelta(milliseconds=station.radiant_low_level_interface.board_manager_uptime())}"
     )
 
     board_manager_date_version = stationrc.radiant.DateVersion(
         station.radiant_low_level_interface.read_register("BM_DATEVERSION")
     ).toDict()
-    print("Board Manager version:")
-    print_dict(board_manager_date_version)
+    lines.append("Board Manager version:")
+    lines += format_dict(board_manager_date_version)
 
     board_manager_status = station.radiant_low_level_interface.board_manager_status()
-    print("Board Manager status:")
-    print_dict(board_manager_status)
+    lines.append("Board Manager status:")
+    lines += format_dict(board_manager_status)
 
     board_manager_voltage_readback = (
         station.radiant_low_level_interface.board_manager_voltage_readback()
     )
-    print("Board Manager voltage readback:")
-    print_dict(board_manager_voltage_readback)
+    lines.append("Board Manager voltage readback:")
+    lines += format_dict(board_manager_voltage_readback)
 
     quad_gpio = dict()
     for quad in range(station.radiant_low_level_interface.NUM_QUADS):
         quad_gpio[quad] = station.radiant_low_level_interface.quad_gpio_get(quad)
-    print("Quad GPIO:")
+    lines.append("Quad GPIO:")
     for key in quad_gpio[0].keys():
         line = f"   {key}:\t"
         for quad in range(station.radiant_low_level_interface.NUM_QUADS):
             line += f"{quad_gpio[quad][key]}"
             if quad != station.radiant_low_level_interface.NUM_QUADS - 1:
                 line += "\t"
-        print(line)
+        lines.append(line)
 
     trigger_diode_bias = dict()
     for ch in range(station.radiant_low_level_interface.NUM_CHANNELS):
         trigger_diode_bias[ch] = station.radiant_low_level_interface.trigger_diode_bias_get(
             ch
         )
-    print("Trigger diode bias (V):")
+    lines.append("Trigger diode bias (V):")
     line = "   "
     for ch in range(station.radiant_low_level_interface.NUM_CHANNELS):
         line += f"{ch}: {trigger_diode_bias[ch]:.2f}"
         if ch != station.radiant_low_level_interface.NUM_CHANNELS - 1:
             line += ", "
-    print(line)
+    lines.append(line)
 
     pedestal_voltage = station.radiant_low_level_interface.pedestal_voltage_get()
-    print("Pedestal voltage:")
-    print_dict(pedestal_voltage)
+    lines.append("Pedestal voltage:")
+    lines += format_dict(pedestal_voltage)
 
     data = station.radiant_low_level_interface.lab4d_controller_scan_dump()
-    print("Scan dump: ", ", ".join([f"{key}: {value}" for key, value in data.items()]))
+    lines.append("Scan dump: " + ", ".join([f"{key}: {value}" for key, value in data.items()]))
 
-    if args.channels:
+    if channels:
         for i in range(24):
             data = station.radiant_low_level_interface.lab4d_controller_scan_dump(i)
-            print(f"Scan dump {i}: ", ", ".join([f"{key}: {value}" for key, value in data.items()]))
+            lines.append(f"Scan dump {i}: " + ", ".join([f"{key}: {value}" for key, value in data.items()]))
+
+    return lines
+
+import argparse
+
+parser = argparse.ArgumentParser()
+
+parser.add_argument(
+    "-c", "--channels",
+    action="store_true",
+    help="Print some results per channel"
+)
+
+parser.add_argument(
+    "--host", "--hosts",
+    dest="hosts",
+    type=str, default=[None],
+    nargs="+",
+    help="Specify ip address of host. If `None`, use ip from config in stationrc.")
+
+args = parser.parse_args()
+
+stationrc.common.setup_logging()
+
+if len(args.hosts) == 1:
+    station = stationrc.remote_control.VirtualStation(host=args.hosts[0])
+    print("\n".join(radiant_status(station, args.channels)))
+else:
+    # query all stations in parallel
+    fleet = stationrc.remote_control.StationFleet(hosts=args.hosts)
+    results = fleet.run(lambda station: radiant_status(station, args.channels))
+    for host, res in results.items():
+        print(f"Station {host} ({res['host']}): {res['status']}")
+        if res["status"] == "OK":
+            print("\n".join(res["data"]))
+        else:
+            print(f"   {res['data']}")
@@ -1,4 +1,3 @@
-
 import stationrc.common
 import stationrc.remote_control
 import argparse
@@ -17,10 +16,26 @@ args = parser.parse_args()
 
 stationrc.common.setup_logging()
 
-for host in args.hosts:
-    station = stationrc.remote_control.VirtualStation(host=host)
-    print("Read ppc counter for 10 seconds ...")
 
+def read_pps_counter(station, verbose=False):
+    counts = []
     for _ in range(10):
-        print(station.radiant_low_level_interface.read_register(0x30004))
-        time.sleep(1)
\ No newline at end of file
+        counts.append(station.radiant_low_level_interface.read_register(0x30004))
+        if verbose:
+            print(counts[-1])
+        time.sleep(1)
+
+    return counts
+
+
+print("Read ppc counter for 10 seconds ...")
+if len(args.hosts) == 1:
+    station = stationrc.remote_control.VirtualStation(host=args.hosts[0])
+    read_pps_counter(station, verbose=True)
+else:
+    # read all stations in parallel
+    fleet = stationrc.remote_control.StationFleet(hosts=args.hosts, timeout=30)
+    for host, res in fleet.run(read_pps_counter).items():
+        print(f"{host}: {res['status']}")
+        for count in (res["data"] if res["status"] == "OK" else []):
+            print(count)
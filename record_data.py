@@ -121,7 +121,7 @@ station = stationrc.remote_control.VirtualStation(host=args.host)
 
 data = station.daq_record_data(
     num_events=args.num_events, force_trigger=True, use_uart=args.use_UART,
-    read_header=args.read_windows,
+    read_header=args.read_windows, binary=True, compress=True,
 )
 
 if args.save or args.save_data:
@@ -191,10 +191,11 @@ if args.save_data:
     if not filename.endswith(".json"):
         filename += ".json"
 
+    # the waveforms are received as numpy arrays
     if args.read_windows:
         with open(filename, "w") as f:
-            json.dump(data["data"], f)
+            json.dump(data["data"], f, default=lambda arr: arr.tolist())
 
     else:
         with open(filename, "w") as f:
-            json.dump(data["data"]["WAVEFORM"], f)
+            json.dump(data["data"]["WAVEFORM"], f, default=lambda arr: arr.tolist())
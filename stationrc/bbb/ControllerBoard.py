@@ -1,95 +1,213 @@
 import logging
 import os
-import subprocess
+import queue
+import selectors
 import threading
 import time
 import sys
 
 class ControllerBoard(object):
-    def __init__(self, uart_device, background_sleep=5):
+    # time (in seconds) between attempts to reopen the UART device after it was closed (EOF)
+    REOPEN_INTERVAL = 1
+
+    def __init__(self, uart_device, response_timeout=2, line_timeout=0.2):
+        """
+
+        Parameters
+        ----------
+
+        uart_device: str
+            Path of the UART device of the controller board
+
+        response_timeout: float, optional (Default: 2)
+            Time (in seconds) to wait for the first line of a response
+
+        line_timeout: float, optional (Default: 0.2)
+            A response is complete when no further line arrives within this time (in seconds)
+        """
         self.logger = logging.getLogger("ControllerBoard")
 
-        self.background_sleep = background_sleep
+        self.response_timeout = response_timeout
+        self.line_timeout = line_timeout
         self.do_run = True
+        self._is_shut_down = False
         self.lock = threading.RLock()
+        self.uart_device = uart_device
         self.uart = os.open(uart_device, os.O_RDWR | os.O_NONBLOCK)
 
+        # complete lines received while a command waits for its response
+        self.lines = queue.Queue()
+        self._expect_response = False
+        # the reader thread is woken up via this pipe to shut down
+        self._wakeup_read, self._wakeup_write = os.pipe()
+
         self.thr_bkg = threading.Thread(
             target=ControllerBoard.receive_background_data, args=[self]
         )
         self.thr_bkg.start()
 
     def drain_buffer(self):
-        with self.lock:
-            while True:
-                data = self._readline()
-                if data is None:
-                    break
-                self.logger.debug(f"Drained {data} from buffer.")
+        while True:
+            try:
+                data = self.lines.get_nowait()
+            except queue.Empty:
+                break
+            self.logger.debug(f"Drained {data} from buffer.")
 
     def receive_background_data(self):
-        self.drain_buffer()
+        # Reads from the UART as soon as data arrives and splits it into lines (a line can
+        # be spread over several reads). Lines are passed to a waiting `run_command`,
+        # otherwise (asynchronous messages of the controller board) they are logged.
+        selector = selectors.DefaultSelector()
+        selector.register(self.uart, selectors.EVENT_READ)
+        selector.register(self._wakeup_read, selectors.EVENT_READ)
+
+        buffer = b""
         while self.do_run:
-            time.sleep(self.background_sleep)
-            with self.lock:
-                while True:
-                    data = self._readline()
-                    if data is None:
-                        break
-                    self.logger.info(data)
+            for key, _ in selector.select():
+                if key.fd == self._wakeup_read:
+                    os.read(self._wakeup_read, 1)
+                    continue
+
+                try:
+                    data = os.read(self.uart, 4096)
+                except BlockingIOError:
+                    continue
+                except OSError as e:
+                    self.logger.error(f"Reading from {self.uart_device} failed: {e}")
+                    data = b""
+
+                if data == b"":
+                    # EOF (e.g. the device was disconnected): the fd would be readable forever
+                    self.logger.error(f"Lost connection to {self.uart_device}. Reopen it.")
+                    selector.unregister(self.uart)
+                    self._reopen(selector)
+                    buffer = b""
+                    continue
+
+                buffer += data
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    data = line.decode("latin-1")
+                    if self._expect_response:
+                        self.lines.put(data)
+                    else:
+                        self.logger.info(data)
+
+        selector.close()
 
     def run_command(self, cmd, read_response = True):
         if read_response and check_if_controller_console_is_open():
             self.shut_down()
             sys.exit("Controller console is open. Please close it before calling `run_command_board()` with `read_response == True`.")
 
-        self.drain_buffer()
         if not cmd.startswith("#"):  # all commands start with '#'
             cmd = "#" + cmd
 
-        self.logger.debug(f'Sending "{cmd}" to UART')
         result = ""
         with self.lock:
+            self.drain_buffer()
+            self._expect_response = read_response
+            self.logger.debug(f'Sending "{cmd}" to UART')
             self._write(cmd)
 
             if not read_response:
                 return result
 
-            while True:
-                data = self._readline()
-                if data is None:
-                    break
-                self.logger.info(data)
-                if result != "":
-                    result += "\n"
-                result += data
+            try:
+                deadline = time.time() + self.response_timeout
+                timeout = self.response_timeout
+                while timeout > 0:
+                    try:
+                        data = self.lines.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+
+                    self.logger.info(data)
+                    if result != "":
+                        result += "\n"
+                    result += data
+                    # wait for further lines of the response (but not beyond the deadline)
+                    timeout = min(self.line_timeout, deadline - time.time())
+            finally:
+                self._expect_response = False
+
+        if result == "":
+            self.logger.error(f'No response to "{cmd}" within {self.response_timeout} s.')
 
         return result
 
     def shut_down(self):
+        if self._is_shut_down:  # e.g. by `run_command` and later by the station
+            return
+        self._is_shut_down = True
+
         self.logger.warning("Shutting down!")
         self.do_run = False
+        os.write(self._wakeup_write, b"x")
         self.thr_bkg.join()
-        os.close(self.uart)
+        if self.uart is not None:
+            os.close(self.uart)
+        os.close(self._wakeup_read)
+        os.close(self._wakeup_write)
 
-    def _readline(self):
-        try:
-            data = os.read(self.uart, 2048).decode("latin-1")
-        except BlockingIOError:  # no data in buffers
-            return None
-        if len(data) < 1 or data[-1] != "\n":
-            self.logger.error(f'No proper line of data received. Received "{data}".')
-            return None
-        return data[:-1]  # remove trailing '\n'
+    def _reopen(self, selector):
+        # called by the reader thread, returns when the device is open again or on shut down
+        with self.lock:
+            os.close(self.uart)
+            self.uart = None
+
+        failed = False
+        while self.do_run:
+            # wait before (re)opening, a device which immediately signals EOF again would spin otherwise
+            if len(selector.select(timeout=self.REOPEN_INTERVAL)):
+                os.read(self._wakeup_read, 1)
+                continue
+
+            try:
+                uart = os.open(self.uart_device, os.O_RDWR | os.O_NONBLOCK)
+            except OSError as e:
+                if not failed:  # log only once, the device might be gone for a long time
+                    self.logger.error(f"Failed to reopen {self.uart_device}: {e}. Keep trying.")
+                    failed = True
+                continue
+
+            with self.lock:
+                self.uart = uart
+            selector.register(self.uart, selectors.EVENT_READ)
+            self.logger.info(f"Reopened {self.uart_device}.")
+            return
 
     def _write(self, data):
+        if self.uart is None:
+            raise OSError(f"{self.uart_device} is not open (lost connection).")
         os.write(self.uart, (data + "\n").encode("latin-1"))
 
-def check_if_controller_console_is_open():
-    sp = subprocess.run("ps" + " -ef" + "| grep controller-console | grep -v grep", shell=True, capture_output=True)
-    out = sp.stdout.decode("utf-8").strip('\n')
+# result of the last scan for a controller-console process: (time.monotonic(), result)
+_console_check = (None, False)
+
+
+def check_if_controller_console_is_open(ttl=10):
+    """
+    Returns True if a controller-console process is running. The result is cached for `ttl`
+    seconds, the check scans the command lines in /proc (no new process is spawned).
+    """
+    global _console_check
+    now = time.monotonic()
+    if _console_check[0] is not None and now - _console_check[0] < ttl:
+        return _console_check[1]
+
+    is_open = False
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit() or int(pid) == os.getpid():
+            continue
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                if b"controller-console" in f.read():
+                    is_open = True
+                    break
+        except OSError:  # process terminated in the meantime or no permission
+            continue
 
-    if out == "":
-        return False
-    else:
-        return True
+    _console_check = (now, is_open)
+    return is_open
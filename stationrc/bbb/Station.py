@@ -1,18 +1,37 @@
+import collections
 import json
 import libconf
 import logging
+import numpy as np
 import pathlib
+import queue
 import threading
+import time
 import zmq
 
 from cobs.cobs import DecodeError
 
 import stationrc.common
 import stationrc.radiant
-from .ControllerBoard import ControllerBoard
+from .ControllerBoard import ControllerBoard, check_if_controller_console_is_open
 
 
 class Station(object):
+    # Remote commands are executed in lanes (one thread each) which run in parallel. The commands
+    # of a lane are executed one after the other, in the order they were received.
+    #   * radiant: everything using the RADIANT (serial port), unknown commands and mixed batches
+    #     (see `_command_lane`)
+    #   * controller: commands for the controller board (UART)
+    #   * daq: waiting for the end of a daq run
+    #   * software: station commands which use neither the RADIANT nor the controller board
+    LANES = ["radiant", "controller", "daq", "software"]
+    DAQ_COMMANDS = ["daq_run_wait"]
+    # daq_run_start (rno-g-acq uses the RADIANT and it sets `acq_proc`) runs in the radiant lane
+    SOFTWARE_COMMANDS = ["daq_run_terminate", "get_data_dir", "monitoring_latest", "monitoring_since",
+                         "write_run_conf"]
+    # time (in seconds) to wait for a lane to finish its current command when shutting down
+    LANE_JOIN_TIMEOUT = 10
+
     def __init__(self, start_thread=True, poll_timeout_ms=1000):
         self.logger = logging.getLogger("Station")
         self.poll_timeout_ms = poll_timeout_ms
@@ -25,6 +44,13 @@ class Station(object):
         # radiant_board is implemented as property and with set _radiant_board the first time its called.
         self._radiant_board = None
 
+        # ring buffer of the (parsed) controller board monitoring, filled by `_sample_monitoring`
+        self.monitoring = collections.deque(maxlen=self.station_conf["monitoring"]["buffer_size"])
+        self._monitoring_lock = threading.Lock()
+        self._monitoring_stop = threading.Event()
+        # stops the lane workers (set by `_receive_remote_command` when it ends)
+        self._lane_stop = threading.Event()
+
         if start_thread:
             self.do_run = True
             self.controller_board = ControllerBoard(uart_device=self.station_conf["daq"]["controller_board_dev"])
@@ -34,6 +60,12 @@ class Station(object):
 
             self.thr_rc.start()
 
+            self.thr_monitoring = None
+            if self.station_conf["monitoring"]["interval"] > 0:
+                self.thr_monitoring = threading.Thread(
+                    target=Station._sample_monitoring, args=[self])
+                self.thr_monitoring.start()
+
             self.radiant_board.calib.load(self._radiant_board.uid())
 
     @property
@@ -59,6 +91,7 @@ class Station(object):
         use_uart=False,
         read_header=False,
         read_pedestal=False,
+        as_list=True,
     ):
         self.logger.info("Start recording data (radiant-try-event) ...")
 
@@ -100,7 +133,8 @@ class Station(object):
             read_header=read_header,
             hdr_file=self.station_conf["daq"]["radiant-try-event_hdr_file"],
             read_pedestal=read_pedestal,
-            ped_file=self.station_conf["daq"]["radiant-try-event_ped_file"]
+            ped_file=self.station_conf["daq"]["radiant-try-event_ped_file"],
+            as_list=as_list,
         )
 
         return {"data": data}
@@ -130,6 +164,18 @@ class Station(object):
             runnumber = int(f.readline())
         return pathlib.Path(conf["output"]["base_dir"]) / f"run{runnumber}"
 
+    def monitoring_latest(self):
+        """ Returns the latest monitoring record {"time": unix time, "data": parsed #MONITOR} or None. """
+        with self._monitoring_lock:
+            if not len(self.monitoring):
+                return None
+            return self.monitoring[-1]
+
+    def monitoring_since(self, timestamp=0):
+        """ Returns all monitoring records (still in the ring buffer) taken after `timestamp` (unix time). """
+        with self._monitoring_lock:
+            return [record for record in self.monitoring if record["time"] > timestamp]
+
     def radiant_calib_isels(self, niter=10, buff=32, step=4, voltage_setting=1250):
         stationrc.radiant.calib_isels(
             self.radiant_board,
@@ -139,6 +185,52 @@ class Station(object):
             voltage_setting=voltage_setting,
         )
 
+    def radiant_calibration_specifics_get(self, channels=None):
+        if channels is None:
+            channels = range(24)
+        return {ch: self.radiant_board.calib.lab4_specifics(ch) for ch in channels}
+
+    def radiant_calibration_specifics_set(self, specifics):
+        # JSON converts the integer keys (channels and registers) into strings
+        for ch, values in specifics.items():
+            for key, value in values.items():
+                self.radiant_board.calib.lab4_specifics_set(int(ch), int(key), value)
+
+    def radiant_get_time_run(self, frequency, trigs_per_roll=4):
+        """
+        Records the zero crossings of all channels and converts them into the sample
+        times, see `stationrc.common.time_run_from_dma`. Returns a float32 array of
+        shape (24, 128) (in ps).
+        """
+        NUM_CHANNELS = 24
+        board = self.radiant_board
+
+        board.labc.stop()
+        board.calram.zero(zerocrossOnly=True)
+        board.calram.mode_str(mode=stationrc.radiant.LAB4_Calram.CalMode.NONE.value)
+        board.labc.start()
+        # junk the first records
+        board.labc.force_trigger(block=True, numTrig=trigs_per_roll, safe=False)
+        board.calram.mode_str(mode=stationrc.radiant.LAB4_Calram.CalMode.ZEROCROSSING.value)
+        for _ in range(3 * trigs_per_roll):
+            board.labc.force_trigger(block=True, numTrig=128, safe=False)
+        board.labc.stop()
+
+        num_rolls = board.calram.numRolls()
+        board.dma.enable(onoff=True, mode=stationrc.radiant.RadDMA.calDmaMode)
+        base = board.calram.get_base()
+        for ch in range(NUM_CHANNELS):
+            board.dma.setDescriptor(
+                num=ch, addr=base + 4096 * 4 * ch, length=4096, increment=True,
+                final=(ch == (NUM_CHANNELS - 1)))
+        board.dma.beginDMA()
+
+        rawtime = np.frombuffer(
+            bytearray(board.dma.dmaread(length=4096 * 4 * NUM_CHANNELS)), dtype="<u4")
+        times = stationrc.common.time_run_from_dma(
+            rawtime.reshape(NUM_CHANNELS, 4096), frequency, num_rolls, trigs_per_roll)
+        return times.astype(np.float32)
+
     def radiant_setup(self, version=3):
         stationrc.radiant.setup_radiant(self, version)
 
@@ -150,9 +242,13 @@ class Station(object):
 
     def shut_down(self):
         self.logger.warning("Shutting down!")
-        self.controller_board.shut_down()
+        self._monitoring_stop.set()
+        if self.thr_monitoring is not None:
+            self.thr_monitoring.join()
+        # stops (and joins) the lane workers, hence no command uses the controller board anymore
         self.do_run = False
         self.thr_rc.join()
+        self.controller_board.shut_down()
 
     def write_run_conf(self, data):
         with open(self.station_conf["daq"]["run_conf"], "w") as f:
@@ -160,6 +256,9 @@ class Station(object):
 
     def parse_message_execute_command(self, message):
         self.logger.debug(f'Received remote command: "{message}".')
+        if "batch" in message:
+            return "OK", self._execute_batch(message["batch"])
+
         if not ("device" in message and "cmd" in message):
             self.logger.error(f'Received malformed command: "{message}".')
             return "ERROR", None
@@ -208,34 +307,161 @@ class Station(object):
         else:
             return "UNKNOWN_DEV", None
 
+    def _execute_batch(self, messages):
+        # execute all commands in order, errors (e.g. a cobs.DecodeError) are handled per command
+        results = list()
+        for message in messages:
+            try:
+                status, data = self._execute_message(message)
+            except Exception as e:
+                self.logger.exception(f'Failed to execute remote command "{message}".')
+                status, data = "ERROR", repr(e)
+
+            result = {"status": status}
+            if data is not None:
+                result["data"] = data
+            results.append(result)
+
+        return results
+
+    def _sample_monitoring(self):
+        # Reads #MONITOR from the controller board every `interval` seconds into the ring buffer.
+        # With a "file" the records are also appended to it (one JSON document per line).
+        conf = self.station_conf["monitoring"]
+        while not self._monitoring_stop.is_set():
+            t = time.time()
+            if check_if_controller_console_is_open():
+                # `run_command` would shut down the controller board (and exit)
+                self.logger.warning("Controller console is open. Skip reading the monitoring.")
+                self._monitoring_stop.wait(conf["interval"])
+                continue
+
+            try:
+                data = json.loads(self.controller_board.run_command("#MONITOR"))
+            except ValueError:
+                self.logger.warning("Could not parse the monitoring of the controller board.")
+            else:
+                record = {"time": t, "data": data}
+                with self._monitoring_lock:
+                    self.monitoring.append(record)
+
+                if conf["file"]:
+                    with open(conf["file"], "a") as f:
+                        f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+            self._monitoring_stop.wait(max(0, t + conf["interval"] - time.time()))
+
+    def _command_lane(self, message):
+        if "batch" in message:
+            # A batch is executed in order in a single lane. A mixed batch runs in the radiant lane,
+            # also its controller board commands: this is safe because `ControllerBoard.run_command`
+            # holds the lock of the board (i.e. it is not used by the controller lane at the same
+            # time) and all other commands do not share state with the radiant lane. Note that a
+            # `daq_run_wait` in a mixed batch blocks the radiant lane until the run ends.
+            lanes = set(self._command_lane(sub_message) for sub_message in message["batch"])
+            return lanes.pop() if len(lanes) == 1 else "radiant"
+
+        if message.get("device") == "controller-board":
+            return "controller"
+        elif message.get("device") == "station":
+            if message.get("cmd") in self.DAQ_COMMANDS:
+                return "daq"
+            elif message.get("cmd") in self.SOFTWARE_COMMANDS:
+                return "software"
+
+        return "radiant"
+
+    def _execute_message(self, message):
+        try:
+            return self.parse_message_execute_command(message)
+        except DecodeError:
+            self.logger.warning("Detect cobs.DecodeError! Reinitialize radiant object ...")
+            self._radiant_board = None
+            try:
+                return self.parse_message_execute_command(message)
+            except DecodeError:
+                return "ERROR", "Catched a cobs.DecodeError"
+
     def _receive_remote_command(self):
+        # A ROUTER socket serves REQ (RemoteControl) and DEALER (AsyncRemoteControl) clients. Both
+        # send [b"", message], the ROUTER prepends the identity of the client. The messages are
+        # queued to the worker of their lane, the workers send back the replies (with the envelope)
+        # through an inproc PUSH/PULL socket pair because zmq sockets are not thread-safe.
         context = zmq.Context()
-        socket = context.socket(zmq.REP)
+        socket = context.socket(zmq.ROUTER)
         socket.bind(f'tcp://*:{self.station_conf["remote_control"]["port"]}')
+        replies = context.socket(zmq.PULL)
+        replies.bind(f"inproc://replies-{id(self)}")
+
+        self._lane_queues = {lane: queue.Queue() for lane in self.LANES}
+        self._lane_stop.clear()
+        workers = dict()
+        for lane in self.LANES:
+            # daemon threads: a lane can be blocked for long (e.g. daq_run_wait), it must not
+            # keep the process alive if it does not finish within `LANE_JOIN_TIMEOUT`
+            workers[lane] = threading.Thread(target=Station._lane_worker, args=[self, lane, context], daemon=True)
+            workers[lane].start()
+
         poller = zmq.Poller()
         poller.register(socket, zmq.POLLIN)
+        poller.register(replies, zmq.POLLIN)
 
         while self.do_run:
-            events = poller.poll(self.poll_timeout_ms)
-            for ev in events:
-                if ev[1] == zmq.POLLIN:
-                    message = ev[0].recv_json()
-                    try:
-                        status, data = self.parse_message_execute_command(message)
-                        if data is not None:
-                            socket.send_json({"status": status, "data": data})
-                        else:
-                            socket.send_json({"status": status})
-
-                    except DecodeError:
-                        self.logger.warning("Detect cobs.DecodeError! Reinitialize radiant object ...")
-                        self._radiant_board = None
-                        try:
-                            status, data = self.parse_message_execute_command(message)
-                            if data is not None:
-                                socket.send_json({"status": status, "data": data})
-                            else:
-                                socket.send_json({"status": status})
-
-                        except DecodeError:
-                            socket.send_json({"status": "ERROR", "data": "Catched a cobs.DecodeError"})
+            events = dict(poller.poll(self.poll_timeout_ms))
+            if replies in events:
+                socket.send_multipart(replies.recv_multipart(copy=False), copy=False)
+
+            if socket in events:
+                frames = socket.recv_multipart()
+                envelope, message = frames[:-1], json.loads(frames[-1])
+                lane = self._command_lane(message)
+                self.logger.debug(f'Queue remote command in lane "{lane}".')
+                self._lane_queues[lane].put((envelope, message))
+
+        # the workers finish their current command (queued commands are dropped), keep forwarding
+        # their replies meanwhile (a worker would block on sending otherwise)
+        self._lane_stop.set()
+        deadline = time.time() + self.LANE_JOIN_TIMEOUT
+        while any(worker.is_alive() for worker in workers.values()) and time.time() < deadline:
+            if replies.poll(100):
+                socket.send_multipart(replies.recv_multipart(copy=False), copy=False)
+        busy = [lane for lane, worker in workers.items() if worker.is_alive()]
+
+        socket.close(linger=0)
+        replies.close(linger=0)
+        if len(busy):
+            # terminating the context would block until the busy workers closed their sockets
+            self.logger.error(f"Lanes {busy} did not finish within {self.LANE_JOIN_TIMEOUT} s, abandon them.")
+        else:
+            context.term()
+
+    def _lane_worker(self, lane, context):
+        replies = context.socket(zmq.PUSH)
+        replies.connect(f"inproc://replies-{id(self)}")
+
+        while not self._lane_stop.is_set():
+            try:
+                envelope, message = self._lane_queues[lane].get(timeout=self.poll_timeout_ms / 1000)
+            except queue.Empty:
+                continue
+
+            try:
+                status, data = self._execute_message(message)
+                frames = self._pack_reply(status, data, message.get("compress", False), message.get("id"))
+            except Exception as e:
+                # keep the lane alive (also if the result can not be serialized), the client gets the error
+                self.logger.exception(f'Failed to execute remote command "{message}".')
+                frames = self._pack_reply("ERROR", repr(e), request_id=message.get("id"))
+
+            replies.send_multipart(envelope + frames, copy=False)
+
+        replies.close(linger=0)
+
+    def _pack_reply(self, status, data, compress=False, request_id=None):
+        # numpy arrays in `data` are sent as raw binary frames
+        reply = {"status": status}
+        if data is not None:
+            reply["data"] = data
+        if request_id is not None:
+            reply["id"] = request_id
+        return stationrc.common.pack_message(reply, compress=compress)
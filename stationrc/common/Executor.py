@@ -1,13 +1,34 @@
+import collections
 import logging
 import subprocess
 import threading
 
 
 class Executor(object):
-    def __init__(self, cmd, logger=logging.getLogger("root")):
+    def __init__(self, cmd, logger=logging.getLogger("root"), capture=False, max_lines=None):
+        """
+        Runs `cmd` in a subprocess and logs its stdout (info) and stderr (error) line by line.
+
+        Parameters
+        ----------
+
+        cmd: list
+            Command and its arguments
+
+        logger: logging.Logger, optional
+            Logger for the output of the command
+
+        capture: bool, optional (Default: False)
+            If True, keep the lines of the output in `stdout` and `stderr` (otherwise they are None)
+
+        max_lines: int, optional (Default: None)
+            Only keep the last `max_lines` lines of each stream. None means keep all lines.
+        """
         self.logger = logger
+        self.returncode = None
+        self.stdout = collections.deque(maxlen=max_lines) if capture else None
+        self.stderr = collections.deque(maxlen=max_lines) if capture else None
 
-        self.do_run = True
         self.proc = subprocess.Popen(
             cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
         )
@@ -19,34 +40,32 @@ class Executor(object):
         self.th_stderr.start()
 
     def read_stderr(self):
-        while self.do_run:
-            data = self.proc.stderr.readline().decode("latin-1")[
-                :-1
-            ]  # remove trailing '\n'
-            if len(data) > 0:
-                self.logger.error(data)
-            else:
-                self.logger.debug("No data on stderr.")
+        self._read_stream(self.proc.stderr, self.logger.error, self.stderr)
 
     def read_stdout(self):
-        while self.do_run:
-            data = self.proc.stdout.readline().decode("latin-1")[
-                :-1
-            ]  # remove trailing '\n'
+        self._read_stream(self.proc.stdout, self.logger.info, self.stdout)
+
+    def _read_stream(self, stream, log, lines):
+        # blocks until a line is available, stops when the process closed the stream (EOF)
+        for line in iter(stream.readline, b""):
+            data = line.decode("latin-1").rstrip("\n")
             if len(data) > 0:
-                self.logger.info(data)
-            else:
-                self.logger.debug("No data on stdout.")
+                log(data)
+            if lines is not None:
+                lines.append(data)
+        stream.close()
 
     def terminate(self):
+        """ Terminates the process and returns its exit code. """
         self.proc.terminate()
-        self.wrap_up()
+        return self.wait()
 
     def wait(self):
-        self.proc.wait()
+        """ Waits for the process (and its output) and returns its exit code. """
+        self.returncode = self.proc.wait()
         self.wrap_up()
+        return self.returncode
 
     def wrap_up(self):
-        self.do_run = False
         self.th_stdout.join()
         self.th_stderr.join()
@@ -1,6 +1,8 @@
 import enum
 import json
+import logging
 import numpy as np
+import os
 import pathlib
 
 from .RawDataFile import RawDataFile
@@ -19,70 +21,249 @@ class PacketType(enum.Enum):
     WAVEFORM = WAVEFORM_MAGIC
 
 
+# All packets are written without padding in little-endian byte order
+FIELD_DTYPES = {
+    "char": "S1",
+    "double": "<f8",
+    "float": "<f4",
+    "int8": "i1",
+    "int16": "<i2",
+    "int32": "<i4",
+    "uint8": "u1",
+    "uint16": "<u2",
+    "uint32": "<u4",
+    "uint64": "<u8",
+}
+
+# One entry per packet in a file
+INDEX_DTYPE = np.dtype([("magic", "<u2"), ("version", "<u2"), ("offset", "<u8")])
+
+# Index files of compressed data files are kept in this sub-directory next to the data
+INDEX_DIRECTORY = ".index"
+
+
+class PacketLayout(object):
+    """
+    Compiled form of one (packet type, version) entry of the data format.
+
+    The fields are mapped onto a numpy structured dtype. If the shape of a field
+    depends on the value of an earlier field (e.g. "$radiant_nsamples") the layout
+    is split into a `head`, which contains all fields up to that point, and a
+    `tail`, whose dtype is compiled (and cached) once the head is decoded.
+    """
+
+    def __init__(self, type, head, nested, tail_fields, tail_dims):
+        self.type = type
+        self.head = head
+        self.nested = nested
+        self.tail_fields = tail_fields
+        self.tail_dims = tail_dims
+        self.tails = dict()
+
+
 class RNOGDataFile(RawDataFile):
     RNO_G_NUM_LT_CHANNELS = 4
     RNO_G_NUM_RADIANT_CHANNELS = 24
     RNO_G_LAB4D_NSAMPLES = 4096
     RNO_G_PEDESTAL_NSAMPLES = RNO_G_LAB4D_NSAMPLES
 
-    def __init__(self, filename):
-        super(RNOGDataFile, self).__init__(filename)
+    # shared by all files, the layouts only depend on the data format
+    _layouts = dict()
+
+    def __init__(self, filename, use_mmap=False):
+        """
+        Packets are read sequentially with `get_next_packet`. Random access by packet
+        number is available through `len(file)`, `file[i]` and `file[i:j]`, which
+        build an index of the packet offsets on first use. Random access moves the
+        position of `get_next_packet`.
+
+        With `use_mmap=True` (uncompressed files only) the arrays of the returned
+        packets are read-only views into the memory-mapped file.
+
+        For compressed files the index also stores the gzip member boundaries and is
+        saved as a sidecar file (see `index_file`), so re-opening a file does not
+        require decompressing it again. The sidecar is rebuilt when the size or the
+        modification time of the data file changed.
+        """
+        super(RNOGDataFile, self).__init__(filename, use_mmap=use_mmap)
         with open(
             pathlib.Path(__file__).parent / "conf" / "rno-g_data_format.json", "r"
         ) as f:
             self.data_format = json.load(f)
 
+        self._index = None
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return [self[i] for i in range(*idx.indices(len(self)))]
+
+        if idx < 0:
+            idx += len(self)
+        if idx < 0 or idx >= len(self):
+            raise IndexError(f"Packet {idx} out of range.")
+
+        self.seek_packet(idx)
+        return self.get_next_packet()
+
+    def __iter__(self):
+        # sequential iteration from the current position
+        return iter(self.get_next_packet, None)
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def index(self):
+        if self._index is None:
+            if self.filename.endswith(".gz"):
+                self._index = self._load_or_build_gzip_index()
+            else:
+                self._index = self.build_index()
+        return self._index
+
+    @property
+    def index_file(self):
+        path = pathlib.Path(self.filename)
+        return path.parent / INDEX_DIRECTORY / f"{path.name}.npz"
+
+    def build_index(self):
+        """Scans the file for the type, version and byte offset of every packet without decoding the payload."""
+        pos = self.tell()
+        self.seek(0)
+
+        entries = list()
+        while True:
+            offset = self.tell()
+            try:
+                magic = self.read_uint16()
+                version = self.read_uint16()
+                layout = self.get_layout(PacketType(magic).name, f"v{version}")
+                head = np.frombuffer(self.read_buffer(layout.head.itemsize), dtype=layout.head)
+                nbytes = 4  # checksum
+                if layout.tail_fields:
+                    nbytes += self._get_tail(
+                        layout, {n: head[n][0].item() for n in layout.tail_dims}).itemsize
+                self.skip(nbytes)
+            except EOFError:
+                break
+            entries.append((magic, version, offset))
+
+        self.seek(pos)
+        return np.array(entries, dtype=INDEX_DTYPE)
+
     def get_next_packet(self):
-        try:
-            magic = PacketType(self.read_uint16()).name
-            version = self.read_uint16()
-            packet = self.read_packet(magic, version)
-            packet["_checksum"] = self.read_uint32()
-            return packet
-        except EOFError:
+        packet = self._read_next()
+        if packet is None:
             return None
 
-    def read_packet(self, type, version):
-        version = f"v{version}"
+        layout, records, checksum = packet
+        data = dict()
+        for record in records:
+            data.update(self._to_dict(record, layout))
+        data["_checksum"] = checksum
+        return data
 
-        if type not in self.data_format:
-            raise ValueError(f"Packet type {type} not supported.")
+    def get_layout(self, type, version):
+        key = (type, version)
+        if key not in self._layouts:
+            self._layouts[key] = self._compile_layout(type, version)
+        return self._layouts[key]
 
-        if version not in self.data_format[type]:
-            raise ValueError(f"{type} packet version {version} not supported.")
+    def read_all_columns(self, type=None):
+        """Reads all packets of one type of the file (see `read_batch`)."""
+        if type is None:
+            if len(self) == 0:
+                return None
+            type = PacketType(self.index["magic"][0]).name
 
-        data = {"type": type}
-        for field in self.data_format[type][version]:
-            if len(field) == 2:
-                fcn = getattr(self, f"read_{field[1]}")
-                data[field[0]] = fcn()
+        n = np.count_nonzero(self.index["magic"] == PacketType[type].value)
+        self.seek(0)
+        return self.read_batch(n, type=type)
 
-            elif len(field) == 3:
-                fcn = getattr(self, f"multiread_{field[1]}")
-                shape = list()
+    def read_batch(self, n, type=None):
+        """
+        Reads the next `n` packets of one type into columns.
 
-                for n in field[2]:
-                    if isinstance(n, str):
-                        if n.startswith("$"):
-                            shape.append(data[n[1:]])
-                        else:
-                            shape.append(getattr(self, n))
-                    elif isinstance(n, int):
-                        shape.append(n)
-                    else:
-                        raise ValueError(f"Bad data format: {field}.")
+        Returns a dict with one array per field whose first axis is the packet, e.g.
+        "radiant_waveforms" with shape (n, 24, nsamples) and "event_number" with shape
+        (n,). Nested structs become nested dicts. The arrays are allocated once from
+        the layout of the first packet and filled in place while reading. Packets of
+        other types are skipped; if `type` is None the type of the first packet is
+        used. If the file ends before, fewer than `n` packets are returned. Returns
+        None if there are no more packets.
+        """
+        columns = None
+        count = 0
+        while count < n:
+            packet = self._read_next()
+            if packet is None:
+                break
 
-                length = 1
-                for n in shape:
-                    length *= n
+            layout, records, checksum = packet
+            if type is None:
+                type = layout.type
+            elif layout.type != type:
+                continue
 
-                arr = np.asarray(fcn(length), dtype=getattr(np, field[1]))
-                data[field[0]] = arr.reshape(shape)
-            else:
-                raise ValueError(f"Bad data format: {field}.")
+            if columns is None:
+                dtypes = [record.dtype for record in records]
+                columns = {"type": type, "_checksum": np.empty(n, dtype="<u4")}
+                for record in records:
+                    columns.update(self._allocate_columns(record, layout, n))
+            elif [record.dtype for record in records] != dtypes:
+                raise ValueError(f"{type} packet {count} of the batch has a different shape.")
+
+            for record in records:
+                self._fill_columns(columns, record, layout, count)
+            columns["_checksum"][count] = checksum
+            count += 1
 
+        if columns is None:
+            return None
+
+        if count < n:
+            columns = _slice_columns(columns, count)
+        return columns
+
+    def read_packet(self, type, version):
+        layout = self.get_layout(type, f"v{version}")
+
+        data = dict()
+        for record in self._read_records(layout):
+            data.update(self._to_dict(record, layout))
         return data
 
+    def seek_packet(self, idx):
+        self.seek(int(self.index["offset"][idx]))
+
+    def _load_or_build_gzip_index(self):
+        logger = logging.getLogger("RNOGDataFile")
+        stat = os.stat(self.filename)
+
+        try:
+            with np.load(self.index_file) as sidecar:
+                if sidecar["size"] == stat.st_size and sidecar["mtime_ns"] == stat.st_mtime_ns:
+                    self.members = sidecar["members"]
+                    return sidecar["packets"]
+            logger.debug(f"Index {self.index_file} is outdated.")
+        except (OSError, KeyError, ValueError):
+            pass
+
+        self.members = self.scan_gzip_members()
+        index = self.build_index()
+
+        try:
+            self.index_file.parent.mkdir(exist_ok=True)
+            tmp_file = self.index_file.with_name(f"{self.index_file.name}.{os.getpid()}")
+            with open(tmp_file, "wb") as f:
+                np.savez(f, packets=index, members=self.members,
+                         size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            os.replace(tmp_file, self.index_file)
+        except OSError as e:
+            logger.warning(f"Could not write index {self.index_file}: {e}")
+
+        return index
+
     def read_rno_g_calpulser_info(self):
         return self.read_packet("RNO-G_CALPULSER_INFO", version=0)
 
@@ -100,3 +281,146 @@ class RNOGDataFile(RawDataFile):
 
     def read_rno_g_radiant_trigger_config(self):
         return self.read_packet("rno_g_radiant_trigger_config", version=0)
+
+    def _allocate_columns(self, record, layout, n):
+        columns = dict()
+        for name in record.dtype.names:
+            if name in layout.nested:
+                columns[name] = {"type": layout.nested[name].type}
+                columns[name].update(self._allocate_columns(record[name], layout.nested[name], n))
+            else:
+                columns[name] = np.empty((n,) + record.dtype[name].shape, dtype=record.dtype[name].base)
+        return columns
+
+    def _compile_fields(self, fields, dims=None):
+        """Returns the dtype description of `fields` and the nested packet types.
+
+        Stops at the first field whose shape refers to a value which is not in `dims`
+        and returns the index of this field (or `None` if all fields were compiled).
+        """
+        descr = list()
+        nested = dict()
+        for idx, field in enumerate(fields):
+            if len(field) == 2:
+                if field[1] in FIELD_DTYPES:
+                    descr.append((field[0], FIELD_DTYPES[field[1]]))
+                else:
+                    sub_type = self._nested_packet_type(field)
+                    sub_layout = self.get_layout(sub_type, "v0")
+                    if sub_layout.tail_fields:
+                        raise ValueError(f"Bad data format: {field} has a variable size.")
+                    descr.append((field[0], sub_layout.head))
+                    nested[field[0]] = sub_layout
+
+            elif len(field) == 3:
+                if field[1] not in FIELD_DTYPES:
+                    raise ValueError(f"Bad data format: {field}.")
+
+                shape = list()
+                for n in field[2]:
+                    if isinstance(n, str):
+                        if n.startswith("$"):
+                            if dims is None or n[1:] not in dims:
+                                return descr, nested, idx
+                            shape.append(dims[n[1:]])
+                        else:
+                            shape.append(getattr(self, n))
+                    elif isinstance(n, int):
+                        shape.append(n)
+                    else:
+                        raise ValueError(f"Bad data format: {field}.")
+
+                descr.append((field[0], FIELD_DTYPES[field[1]], tuple(shape)))
+            else:
+                raise ValueError(f"Bad data format: {field}.")
+
+        return descr, nested, None
+
+    def _compile_layout(self, type, version):
+        if type not in self.data_format:
+            raise ValueError(f"Packet type {type} not supported.")
+
+        if version not in self.data_format[type]:
+            raise ValueError(f"{type} packet version {version} not supported.")
+
+        fields = self.data_format[type][version]
+        descr, nested, split = self._compile_fields(fields)
+
+        tail_fields = list()
+        tail_dims = list()
+        if split is not None:
+            tail_fields = fields[split:]
+            for field in tail_fields:
+                if len(field) == 3:
+                    tail_dims += [n[1:] for n in field[2] if isinstance(n, str) and n.startswith("$")]
+
+        return PacketLayout(type, np.dtype(descr), nested, tail_fields, sorted(set(tail_dims)))
+
+    def _fill_columns(self, columns, record, layout, idx):
+        for name in record.dtype.names:
+            if name in layout.nested:
+                self._fill_columns(columns[name], record[name], layout.nested[name], idx)
+            else:
+                columns[name][idx] = record[name][0]
+
+    def _get_tail(self, layout, data):
+        key = tuple(data[n] for n in layout.tail_dims)
+        if key not in layout.tails:
+            descr, nested, split = self._compile_fields(
+                layout.tail_fields, dims=dict(zip(layout.tail_dims, key)))
+            if split is not None:
+                raise ValueError(f"Bad data format: {layout.tail_fields[split]}.")
+            layout.nested.update(nested)
+            layout.tails[key] = np.dtype(descr)
+        return layout.tails[key]
+
+    def _nested_packet_type(self, field):
+        # e.g. "rno_g_lt_scalers" -> "RNO-G_LT_SCALERS"
+        for key in self.data_format:
+            if key.lower().replace("-", "_") == field[1]:
+                return key
+        raise ValueError(f"Bad data format: {field}.")
+
+    def _read_next(self):
+        # returns the layout, the structured arrays and the checksum of the next packet
+        try:
+            magic = PacketType(self.read_uint16()).name
+            version = self.read_uint16()
+            layout = self.get_layout(magic, f"v{version}")
+            records = self._read_records(layout)
+            checksum = self.read_uint32()
+        except EOFError:
+            return None
+        return layout, records, checksum
+
+    def _read_records(self, layout):
+        head = np.frombuffer(self.read_buffer(layout.head.itemsize), dtype=layout.head)
+        if not layout.tail_fields:
+            return [head]
+
+        tail = self._get_tail(layout, {n: head[n][0].item() for n in layout.tail_dims})
+        return [head, np.frombuffer(self.read_buffer(tail.itemsize), dtype=tail)]
+
+    def _to_dict(self, record, layout):
+        # `record` is a structured array of length 1. Arrays are returned as views into it.
+        data = {"type": layout.type}
+        for name in record.dtype.names:
+            if name in layout.nested:
+                data[name] = self._to_dict(record[name], layout.nested[name])
+            elif record.dtype[name].shape:
+                data[name] = record[name][0]
+            else:
+                data[name] = record[name][0].item()
+        return data
+
+
+def _slice_columns(columns, n):
+    res = dict()
+    for key, value in columns.items():
+        if isinstance(value, dict):
+            res[key] = _slice_columns(value, n)
+        elif isinstance(value, np.ndarray):
+            res[key] = value[:n]
+        else:
+            res[key] = value
+    return res
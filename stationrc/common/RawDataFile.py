@@ -1,25 +1,75 @@
+import bisect
 import gzip
+import mmap
+import numpy as np
+import os
 import struct
+import zlib
 
 
-class RawDataFile(object):
-    def __init__(self, filename):
-        if filename.endswith(".gz"):
-            self.file = gzip.open(filename)
-        else:
-            self.file = open(filename, "rb")
-
-    def multiread_int16(self, length):
-        return self._multiread("h", length * 2)
+# Start of every gzip member in the compressed and in the uncompressed stream
+GZIP_MEMBER_DTYPE = np.dtype([("compressed", "<u8"), ("uncompressed", "<u8")])
 
-    def multiread_uint8(self, length):
-        return self._multiread("B", length)
 
-    def multiread_uint16(self, length):
-        return self._multiread("H", length * 2)
-
-    def multiread_uint32(self, length):
-        return self._multiread("I", length * 4)
+class RawDataFile(object):
+    def __init__(self, filename, use_mmap=False):
+        """
+        Parameters
+        ----------
+
+        filename: str
+            Path of the file. Files ending with ".gz" are read through `gzip`.
+
+        use_mmap: bool, optional (Default: False)
+            Memory-map uncompressed files. Buffers are then returned as (read-only)
+            views into the mapped file without copying the data.
+        """
+        self.filename = str(filename)
+        self.mmap = None
+        self.size = None
+        self.members = None  # gzip members, see `scan_gzip_members`
+        self._base = 0  # uncompressed offset of the gzip member `self.file` was opened at
+        self._raw = None
+        if self.filename.endswith(".gz"):
+            self.file = gzip.open(self.filename)
+        else:
+            self.file = open(self.filename, "rb")
+            self.size = os.fstat(self.file.fileno()).st_size
+            if use_mmap and self.size > 0:
+                self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+                self.file.close()
+                self.file = self.mmap
+                self._view = memoryview(self.mmap)
+
+    def multiread_int16(self, length, as_list=False):
+        return self._multiread("<i2", length, as_list)
+
+    def multiread_uint8(self, length, as_list=False):
+        return self._multiread("u1", length, as_list)
+
+    def multiread_uint16(self, length, as_list=False):
+        return self._multiread("<u2", length, as_list)
+
+    def multiread_uint32(self, length, as_list=False):
+        return self._multiread("<u4", length, as_list)
+
+    def read_buffer(self, nbytes):
+        if self.mmap is not None:
+            pos = self.mmap.tell()
+            if pos + nbytes > self.size:
+                raise EOFError
+            self.mmap.seek(pos + nbytes)
+            return self._view[pos:pos + nbytes]
+
+        buf = bytearray(nbytes)
+        view = memoryview(buf)
+        pos = 0
+        while pos < nbytes:
+            n = self.file.readinto(view[pos:])
+            if not n:
+                raise EOFError
+            pos += n
+        return buf
 
     def read_char(self):
         return self._read("c", 1)
@@ -51,12 +101,78 @@ class RawDataFile(object):
     def read_uint64(self):
         return self._read("Q", 8)
 
-    def _multiread(self, fmt, nbytes):
-        try:
-            return [i[0] for i in struct.iter_unpack(f"<{fmt}", self.file.read(nbytes))]
-        except struct.error:
+    def scan_gzip_members(self, chunk_size=1 << 20):
+        """
+        Returns the offsets at which the gzip members of the file start.
+
+        Files written as concatenated gzip members can be entered at every member
+        boundary, so once the members are known (assign the result to `self.members`)
+        `seek` only decompresses the member containing the target position.
+        """
+        members = [(0, 0)]
+        with open(self.filename, "rb") as f:
+            decomp = zlib.decompressobj(zlib.MAX_WBITS | 16)
+            pos = 0
+            uncompressed = 0
+            data = f.read(chunk_size)
+            while data:
+                try:
+                    uncompressed += len(decomp.decompress(data))
+                except zlib.error:  # trailing garbage (e.g. zero padding) after the last member
+                    members.pop()
+                    break
+
+                if not decomp.eof:
+                    pos += len(data)
+                    data = f.read(chunk_size)
+                    continue
+
+                pos += len(data) - len(decomp.unused_data)
+                data = decomp.unused_data or f.read(chunk_size)
+                if data:
+                    members.append((pos, uncompressed))
+                    decomp = zlib.decompressobj(zlib.MAX_WBITS | 16)
+
+        return np.array(members, dtype=GZIP_MEMBER_DTYPE)
+
+    def seek(self, offset):
+        if self.members is None:
+            self.file.seek(offset)
+            return
+
+        idx = bisect.bisect_right(self.members["uncompressed"], offset) - 1
+        start = int(self.members["uncompressed"][idx])
+        pos = self.tell()
+        if pos > offset or pos < start:
+            # re-open the file at the beginning of the member instead of decompressing from the start
+            self.file.close()
+            if self._raw is not None:
+                self._raw.close()
+            self._raw = open(self.filename, "rb")
+            self._raw.seek(int(self.members["compressed"][idx]))
+            self.file = gzip.GzipFile(fileobj=self._raw, mode="rb")
+            self._base = start
+        self.file.seek(offset - self._base)
+
+    def skip(self, nbytes):
+        pos = self.tell() + nbytes
+        if self.size is not None and pos > self.size:
+            raise EOFError
+        self.file.seek(nbytes, 1)
+        if self.tell() != pos:  # gzip stops at the end of the file
             raise EOFError
 
+    def tell(self):
+        return self._base + self.file.tell()
+
+    def _multiread(self, dtype, length, as_list):
+        # returns a view into the read buffer, no copy of the data is made
+        dtype = np.dtype(dtype)
+        arr = np.frombuffer(self.read_buffer(length * dtype.itemsize), dtype=dtype)
+        if as_list:
+            return arr.tolist()
+        return arr
+
     def _read(self, fmt, nbytes):
         try:
             return struct.unpack(f"<{fmt}", self.file.read(nbytes))[0]
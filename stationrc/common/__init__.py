@@ -1,3 +1,4 @@
 from .Executor import Executor
 from .RNOGDataFile import RNOGDataFile
-from .util import rootify, setup_logging, dump_binary
+from .util import rootify, rootify_combine, rootify_convert, setup_logging, dump_binary, iterate_events, read_run, \
+    pack_message, unpack_message, time_run_from_dma
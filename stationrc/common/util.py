@@ -1,115 +1,361 @@
+import concurrent.futures
+import functools
 import json
 import logging
 import logging.config
+import numpy as np
 import pathlib
+import zlib
 
 from stationrc.common.Executor import Executor
 from stationrc.common.RNOGDataFile import RNOGDataFile
 
-def rootify(data_dir, mattak_dir="", logger=logging.getLogger("root")):
-    datadir = pathlib.Path(data_dir)
-
-    daqstatus_root = datadir / "daqstatus.root"
-    header_root = datadir / "header.root"
-    waveforms_root = datadir / "waveforms.root"
+# file type of rno-g-convert: (sub directory, file pattern, output file)
+ROOTIFY_FILE_TYPES = {
+    "ds": ("daqstatus", "*.ds.dat*", "daqstatus.root"),
+    "hd": ("header", "*.hd.dat*", "header.root"),
+    "wf": ("waveforms", "*.wf.dat*", "waveforms.root"),
+}
 
-    daq_files = list((datadir / "daqstatus").glob("*.ds.dat*"))
-    daq_files.sort()
-    proc = Executor(
-        cmd=[pathlib.Path(mattak_dir) / "rno-g-convert", "ds", daqstatus_root] + daq_files,
-        logger=logger,
-    )
-    proc.wait()
 
+def rootify_convert(data_dir, file_type, mattak_dir="", logger=logging.getLogger("root")):
+    """ Converts all files of one type ("ds", "hd" or "wf") of a run with rno-g-convert. """
+    datadir = pathlib.Path(data_dir)
+    sub_dir, pattern, output = ROOTIFY_FILE_TYPES[file_type]
 
-    hdr_files = list((datadir / "header").glob("*.hd.dat*"))
-    hdr_files.sort()
+    files = list((datadir / sub_dir).glob(pattern))
+    files.sort()
     proc = Executor(
-        cmd=[pathlib.Path(mattak_dir) / "rno-g-convert", "hd", header_root] + hdr_files,
+        cmd=[pathlib.Path(mattak_dir) / "rno-g-convert", file_type, datadir / output] + files,
         logger=logger,
     )
     proc.wait()
 
 
-    wfs_files = list((datadir / "waveforms").glob("*.wf.dat*"))
-    wfs_files.sort()
-    proc = Executor(
-        cmd=[pathlib.Path(mattak_dir) / "rno-g-convert", "wf", waveforms_root] + wfs_files,
-        logger=logger,
-    )
-    proc.wait()
+def rootify_combine(data_dir, mattak_dir="", logger=logging.getLogger("root")):
+    """ Combines the converted files of a run into combined.root (see `rootify_convert`). """
+    datadir = pathlib.Path(data_dir)
     proc = Executor(
         cmd=[
             pathlib.Path(mattak_dir) / "rno-g-combine",
             datadir / "combined.root",
-            waveforms_root,
-            header_root,
-            daqstatus_root,
+            datadir / ROOTIFY_FILE_TYPES["wf"][2],
+            datadir / ROOTIFY_FILE_TYPES["hd"][2],
+            datadir / ROOTIFY_FILE_TYPES["ds"][2],
         ],
         logger=logger,
     )
     proc.wait()
 
 
-def dump_binary(wfs_file, read_header=False, hdr_file=None, read_pedestal=False, ped_file=None):
-
+def rootify(data_dir, mattak_dir="", logger=logging.getLogger("root")):
+    # the conversions are independent of each other
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(ROOTIFY_FILE_TYPES)) as executor:
+        futures = [executor.submit(rootify_convert, data_dir, file_type, mattak_dir, logger)
+                   for file_type in ROOTIFY_FILE_TYPES]
+        for future in futures:
+            future.result()
+
+    rootify_combine(data_dir, mattak_dir, logger)
+
+
+def dump_binary(wfs_file, read_header=False, hdr_file=None, read_pedestal=False, ped_file=None, as_list=True):
+    """
+    Reads a complete file into lists of packets. Arrays are converted to lists
+    unless `as_list` is False.
+
+    The "WAVEFORM" and "HEADER" lists contain all packets of their file in file order,
+    i.e., they are not matched (and may differ in length). Use `iterate_events` to get
+    the waveforms paired with their headers (by event number) without holding all
+    events in memory.
+    """
     if read_header and hdr_file is None:
         raise ValueError("You have to specify 'hdr_file'!")
 
     if read_pedestal and ped_file is None:
         raise ValueError("You have to specify 'ped_file'!")
 
-    waveforms = RNOGDataFile(wfs_file)
+    convert = _arrays_to_lists if as_list else lambda packet: packet
 
-    data = {"WAVEFORM": []}
-    while True:
-        packet = waveforms.get_next_packet()
-        if packet is None:
-            break
+    data = {"WAVEFORM": [convert(packet) for packet in RNOGDataFile(wfs_file)]}
+    if read_header:
+        data["HEADER"] = [convert(packet) for packet in RNOGDataFile(hdr_file)]
+
+    if read_pedestal:
+        data["PEDESTAL"] = [convert(packet) for packet in RNOGDataFile(ped_file)]
 
-        packet["radiant_waveforms"] = packet["radiant_waveforms"].tolist()
-        packet["lt_waveforms"] = packet["lt_waveforms"].tolist()
-        packet["digitizer_readout_delay"] = packet["digitizer_readout_delay"].tolist()
-        data["WAVEFORM"].append(packet)
+    return data
 
-    if read_header:
-        headers = RNOGDataFile(hdr_file)
 
-        data["HEADER"] = list()
-        while True:
-            packet = headers.get_next_packet()
-            if packet is None:
-                break
+def iterate_events(wfs_file, hdr_file=None, lookahead=16, logger=logging.getLogger("root")):
+    """
+    Yields the events of a waveform file one by one as (waveform, header) tuples.
 
-            packet["radiant_start_windows"] = packet[
-                "radiant_start_windows"
-            ].tolist()
-            packet["simple_trig_conf"]["_bitfield_stuff"] = packet[
-                "simple_trig_conf"
-            ]["_bitfield_stuff"].tolist()
-            packet["trig_conf"]["_bitfield_stuff"] = packet["trig_conf"][
-                "_bitfield_stuff"
-            ].tolist()
+    Headers are matched to the waveforms by their (increasing) event number. Only up to
+    `lookahead` headers are read ahead while searching for a match; the search stops
+    as soon as a header of a later event is read. If no header is found for a waveform
+    (or no `hdr_file` is given), `header` is None.
+    """
+    headers = None if hdr_file is None else iter(RNOGDataFile(hdr_file))
+    buffer = dict()
+    last_event_number = None  # of the last header read
 
-            data["HEADER"].append(packet)
+    for waveform in RNOGDataFile(wfs_file):
+        if headers is None:
+            yield waveform, None
+            continue
 
-    if read_pedestal:
-        pedestals = RNOGDataFile(ped_file)
+        event_number = waveform["event_number"]
+        while event_number not in buffer and len(buffer) < lookahead:
+            if last_event_number is not None and last_event_number > event_number:
+                break  # already past this event, its header is missing
 
-        data["PEDESTAL"] = list()
-        while True:
-            packet = pedestals.get_next_packet()
-            if packet is None:
+            header = next(headers, None)
+            if header is None:
                 break
 
-            packet["vbias"] = packet["vbias"].tolist()
-            packet["pedestals"] = packet["pedestals"].tolist()
-
-            data["PEDESTAL"].append(packet)
+            last_event_number = header["event_number"]
+            buffer[last_event_number] = header
+
+        header = buffer.pop(event_number, None)
+        # headers of earlier events can not be matched anymore, keep the ones of later events
+        for number in [number for number in buffer if number < event_number]:
+            del buffer[number]
+
+        if header is None:
+            logger.warning(f"No header found for event {event_number} in {hdr_file}.")
+        yield waveform, header
+
+
+def pack_message(message, compress=False):
+    """
+    Serializes a message (nested dicts / lists) into a list of zmq frames.
+
+    The first frame is the JSON encoded message in which every numpy array is replaced
+    by a reference to one of the following frames. These hold the raw (little-endian)
+    array data, optionally compressed with zlib. A message without arrays results in a
+    single frame, which is identical to what `socket.send_json` sends.
+    """
+    buffers = list()
+
+    def replace_arrays(obj):
+        if isinstance(obj, np.ndarray):
+            arr = np.ascontiguousarray(obj, dtype=obj.dtype.newbyteorder("<"))
+            buffers.append(zlib.compress(arr, 1) if compress else arr.data)
+            return {"__ndarray__": len(buffers), "dtype": arr.dtype.str, "shape": arr.shape}
+        if isinstance(obj, dict):
+            return {key: replace_arrays(value) for key, value in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [replace_arrays(value) for value in obj]
+        return obj
+
+    header = replace_arrays(message)
+    if len(buffers):
+        header = {"__frames__": header, "compression": "zlib" if compress else None}
+
+    return [json.dumps(header).encode("utf-8")] + buffers
+
+
+def unpack_message(frames):
+    """Inverse of `pack_message`. Arrays are returned as read-only numpy arrays."""
+    message = json.loads(bytes(frames[0]))
+    if len(frames) == 1:
+        return message
+
+    compressed = message["compression"] == "zlib"
+
+    def restore_arrays(obj):
+        if isinstance(obj, dict):
+            if "__ndarray__" in obj:
+                buffer = frames[obj["__ndarray__"]]
+                if compressed:
+                    buffer = zlib.decompress(buffer)
+                return np.frombuffer(buffer, dtype=obj["dtype"]).reshape(obj["shape"])
+            return {key: restore_arrays(value) for key, value in obj.items()}
+        if isinstance(obj, list):
+            return [restore_arrays(value) for value in obj]
+        return obj
+
+    return restore_arrays(message["__frames__"])
+
+
+def read_run(run_dir, read_header=True, max_workers=None):
+    """
+    Reads all waveform (and header) files of a run directory into columns.
+
+    The files are decoded in parallel by a pool of `max_workers` processes (default:
+    number of CPUs). Each process returns the columns of one file as numpy arrays
+    (see `RNOGDataFile.read_batch`), which are concatenated in file order, i.e. the
+    events keep the order in which they were recorded.
+
+    Returns
+    -------
+
+    data: dict
+        {"WAVEFORM": columns, "HEADER": columns}. "HEADER" only if `read_header` is
+        True. The columns are None if there are no files.
+
+    Raises a `ValueError` if the files can not be combined, i.e., if the shape of a
+    column (e.g. the number of samples) or the file version differs between the files.
+    """
+    run_dir = pathlib.Path(run_dir)
+    files = {"WAVEFORM": sorted((run_dir / "waveforms").glob("*.wf.dat*"))}
+    if read_header:
+        files["HEADER"] = sorted((run_dir / "header").glob("*.hd.dat*"))
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            type: [executor.submit(_read_file_columns, str(f), type) for f in type_files]
+            for type, type_files in files.items()
+        }
+        data = dict()
+        for type, type_futures in futures.items():
+            columns = [(f, future.result()) for f, future in zip(files[type], type_futures)]
+            columns = [(f, c) for f, c in columns if c is not None]
+            if len(columns):
+                _check_columns(columns)
+                data[type] = _concatenate_columns([c for _, c in columns])
+            else:
+                data[type] = None
 
     return data
 
 
+def time_run_from_dma(rawtime, frequency, num_rolls, trigs_per_roll=4):
+    """
+    Converts the raw zero crossing counts into the sample times (in ps).
+
+    Parameters
+    ----------
+
+    rawtime: np.ndarray
+        DMA readout(s) with shape (24, 4096) or (n_runs, 24, 4096)
+
+    frequency: float
+        Frequency of the signal (in Hz)
+
+    num_rolls: int or array of int
+        Number of rolls (one per readout)
+
+    trigs_per_roll: int, optional (Default: 4)
+
+    Returns
+    -------
+
+    times: np.ndarray
+        Shape (24, 128) or (n_runs, 24, 128)
+    """
+    rawtime = np.asarray(rawtime)
+    # Building up the times is a little harder than the pedestals.
+    # The first thing we do is zero out the invalid seams. That way when we add everything,
+    # all we need to do is rescale the seam by 8/3s.
+    timeByLab = np.where(_seam_mask(trigs_per_roll), rawtime, 0)
+
+    # We now reshape our times by window. 128 samples per window, 32 windows per roll.
+    # So we're now an array of [...][numLabs][32][128].
+    # Sum along the window axis, because the samples within a window have the same time.
+    # We're now shape (..., 24, 128)
+    timeByWindow = timeByLab.reshape(rawtime.shape[:-1] + (32, 128)).sum(axis=-2)
+
+    # convert to time. The denominator is number of windows in a roll, numerator is number of picoseconds/cycle.
+    num_rolls = np.asarray(num_rolls, dtype=float).reshape(np.shape(num_rolls) + (1, 1))
+    convFactor = (1e12 / frequency) / (num_rolls * 32)
+    # This has to be A = A*B because we're actually creating a new array
+    # since we're moving to floats.
+    timeByWindow = timeByWindow * convFactor
+
+    # Now rescale the seams, because the seams have lower statistics.
+    # This is the number of windows in a record (eg if 4 trigs = 8)
+    windowsPerRecord = 4096 / (trigs_per_roll * 128)
+    # This is the number of *valid* windows per record (e.g. if 4 trigs = 3)
+    validWindowsPerRecord = windowsPerRecord / 2 - 1
+    rescale = validWindowsPerRecord * trigs_per_roll / 32
+    # This rescales time 0 of all LABs (and runs). So if we had 4 trigs per roll, that means only 12/32 of
+    # the zerocrossings were nonzero, so we divide by 12/32 (or multiply by 32/12).
+    timeByWindow[..., 0] /= rescale
+    # and we're done
+    return timeByWindow
+
+
+def _arrays_to_lists(packet):
+    return {
+        key: value.tolist() if isinstance(value, np.ndarray) else
+        _arrays_to_lists(value) if isinstance(value, dict) else value
+        for key, value in packet.items()
+    }
+
+
+def _check_columns(columns, prefix=""):
+    # columns: list of (filename, columns), raises if a column can not be concatenated
+    reference_file, reference = columns[0]
+    for filename, file_columns in columns[1:]:
+        if file_columns.keys() != reference.keys():
+            raise ValueError(
+                f"Can not combine {filename}: the columns of {prefix.rstrip('.') or 'the packets'} differ from "
+                f"{reference_file} (different version?): {sorted(file_columns.keys() ^ reference.keys())}")
+
+        for key, value in reference.items():
+            other = file_columns[key]
+            if isinstance(value, dict):
+                _check_columns([(reference_file, value), (filename, other)], prefix=f"{prefix}{key}.")
+            elif isinstance(value, np.ndarray):
+                if not isinstance(other, np.ndarray) or other.shape[1:] != value.shape[1:]:
+                    shape = other.shape[1:] if isinstance(other, np.ndarray) else None
+                    raise ValueError(
+                        f"Can not combine {filename}: column {prefix}{key} has the shape {shape} per event "
+                        f"but {value.shape[1:]} in {reference_file} (different number of samples or version?).")
+            elif other != value:
+                raise ValueError(
+                    f"Can not combine {filename}: {prefix}{key} is {other} but {value} in {reference_file}.")
+
+
+def _concatenate_columns(columns):
+    res = dict()
+    for key, value in columns[0].items():
+        if isinstance(value, dict):
+            res[key] = _concatenate_columns([c[key] for c in columns])
+        elif isinstance(value, np.ndarray):
+            res[key] = np.concatenate([c[key] for c in columns])
+        else:
+            res[key] = value
+    return res
+
+
+def _read_file_columns(filename, type, batch_size=256):
+    # read in batches to decompress the file only once (no index is needed)
+    data = RNOGDataFile(filename)
+    batches = list()
+    while True:
+        columns = data.read_batch(batch_size, type=type)
+        if columns is None:
+            break
+        batches.append(columns)
+
+    if len(batches) == 0:
+        return None
+    return _concatenate_columns(batches)
+
+
+@functools.lru_cache(maxsize=None)
+def _seam_mask(trigs_per_roll):
+    # The invalid seams are 0 and every (sample % 256) = 128 for *every trigger*.
+    # So if we have 4 triggers in a roll of 4096, the invalid seams are 0, 128, 384, 640, 896.
+    # and we only have 3/8 valid.
+    samplesPerRecord = 4096 // trigs_per_roll
+    windowsPerRecord = samplesPerRecord / 128
+    record_starts = samplesPerRecord * np.arange(trigs_per_roll)
+    buffered = 256 * np.arange(int(windowsPerRecord / 2)) + 128
+
+    mask = np.ones(4096, dtype=bool)
+    # The first one is always invalid because we don't have the last when it arrives.
+    mask[record_starts] = False
+    # Now every (sample % 256) == 128 is invalid because we buffer them in case the
+    # next seam is invalid due to being the end of the record.
+    mask[(record_starts[:, None] + buffered[None, :]).ravel()] = False
+    mask.flags.writeable = False
+    return mask
+
+
 def setup_logging():
     with open(pathlib.Path(__file__).parent / "conf" / "logging_conf.json", "r") as f:
         conf = json.load(f)
@@ -127,38 +373,25 @@ if __name__ == "__main__":
     if not os.path.exists(waveforms_dir):
         raise ValueError(f"Waveforms directory {waveforms_dir} does not exist!")
 
-    waveform_files = os.listdir(waveforms_dir)
-    if len(waveform_files) == 0:
+    data = read_run(sys.argv[1])
+    if data["WAVEFORM"] is None:
         raise ValueError(f"Waveforms directory {waveforms_dir} is empty!")
 
-    print(f"Found {len(waveform_files)} waveform files in {waveforms_dir}.")
-    waveform_files = sorted(waveform_files)
-
-    headers_dir = os.path.join(sys.argv[1], "header")
-
-    for idx, wf_file in enumerate(waveform_files):
-        wf_file_path = os.path.join(waveforms_dir, wf_file)
-        hdr_file_path = os.path.join(headers_dir, wf_file.replace("wf", "hd"))
-
-        data = dump_binary(
-            wf_file_path,
-            read_header=os.path.exists(hdr_file_path),
-            hdr_file=hdr_file_path
-        )
-
-        if "HEADER" in data:
-            hdr_data = data["HEADER"]
+    wf_data = data["WAVEFORM"]
+    print(f"Read {len(wf_data['event_number'])} events from {waveforms_dir}.")
 
-        for event_idx, event_wf_data in enumerate(data["WAVEFORM"]):
-            event_number = event_wf_data["event_number"]
-            run_number = event_wf_data["run_number"]
-            station = event_wf_data["station"]
-            radiant_sampling_rate = event_wf_data["radiant_sampling_rate"]
-            wfs = event_wf_data["radiant_waveforms"]
+    event_number = wf_data["event_number"]
+    run_number = wf_data["run_number"]
+    station = wf_data["station"]
+    radiant_sampling_rate = wf_data["radiant_sampling_rate"]
+    wfs = wf_data["radiant_waveforms"]  # shape (events, channels, samples)
 
-            if "HEADER" in data:
-                header = hdr_data[event_idx]
-                assert header["event_number"] == event_number, "Missmatch between wf and hdr data"
-                trigger_type = header["trigger_type"]
+    if data["HEADER"] is not None:
+        hdr_data = data["HEADER"]
+        # headers belonging to the waveforms
+        idx = np.searchsorted(hdr_data["event_number"], event_number)
+        idx = np.clip(idx, 0, len(hdr_data["event_number"]) - 1)
+        assert np.all(hdr_data["event_number"][idx] == event_number), "Missmatch between wf and hdr data"
+        trigger_type = hdr_data["trigger_type"][idx]
 
-            # do something with the data
\ No newline at end of file
+    # do something with the data
@@ -0,0 +1,148 @@
+import asyncio
+import itertools
+import json
+import logging
+import zmq
+import zmq.asyncio
+
+from stationrc.common import unpack_message
+from .RemoteControl import _batch_results
+
+
+class AsyncRemoteControl(object):
+    """
+    asyncio client for the station with any number of commands in flight.
+
+    Commands are sent with a request id over a DEALER socket and the replies (which carry
+    the id) are matched to the waiting coroutines. Only commands on the remote station are
+    supported (no local mode, no remote logging).
+
+        async with AsyncRemoteControl(host, port) as rc:
+            uptime, rev = await asyncio.gather(
+                rc.send_command("radiant-board", "readReg", {"addr": 0x4000E8}),
+                rc.send_command("radiant-board", "readReg", {"addr": 0x40005C}))
+
+    Note that the station executes commands in lanes (radiant, controller, daq and software,
+    see `Station.LANES`) which run in parallel. Only the commands of the same lane are executed
+    in the order they arrive; commands of different lanes (e.g. in one `asyncio.gather`) can
+    be executed in any order. Use a batch or await the commands one by one if the order matters.
+    """
+    def __init__(self, host, port, timeout=10):
+        """
+
+        Parameters
+        ----------
+
+        host: str
+            Ip address of the station
+
+        port: int
+            Port of the station
+
+        timeout: float, optional (Default: 10)
+            Default timeout (in seconds) for a command. None means wait forever.
+        """
+        self.logger = logging.getLogger("AsyncRemoteControl")
+        self.timeout = timeout
+
+        self.context = zmq.asyncio.Context.instance()
+        self.socket = self.context.socket(zmq.DEALER)
+        self.socket.setsockopt(zmq.LINGER, 0)
+        socket_add = f"tcp://{host}:{port}"
+        self.logger.info(f"Connect to socket: '{socket_add}'.")
+        self.socket.connect(socket_add)
+
+        self._request_ids = itertools.count()
+        self._pending = dict()
+        self._receiver = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self._receiver is not None:
+            self._receiver.cancel()
+            self._receiver = None
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        self.socket.close()
+
+    async def send_command(self, device, cmd, data=None, compress=False, timeout=None):
+        """
+        Executes a command on the station and returns its result. Raises `asyncio.TimeoutError`
+        if there is no reply within `timeout` seconds (default: `self.timeout`).
+        """
+        tx = {"device": device, "cmd": cmd}
+        if data is not None:
+            tx["data"] = json.dumps(data)
+        if compress:
+            tx["compress"] = True
+
+        return self._handle_reply(tx, await self._execute(tx, timeout))
+
+    async def send_commands(self, commands, compress=False, timeout=None):
+        """
+        Executes a list of (device, cmd, data) tuples in one message and returns the list of
+        results. Raises a `RuntimeError` if any command failed (see `RemoteControl.batch`).
+        """
+        batch = list()
+        for device, cmd, data in commands:
+            tx = {"device": device, "cmd": cmd}
+            if data is not None:
+                tx["data"] = json.dumps(data)
+            batch.append(tx)
+
+        tx = {"batch": batch}
+        if compress:
+            tx["compress"] = True
+
+        message = await self._execute(tx, timeout)
+        return _batch_results(self, batch, message)
+
+    async def _execute(self, tx, timeout=None):
+        if self._receiver is None:
+            self._receiver = asyncio.ensure_future(self._receive_replies())
+
+        request_id = next(self._request_ids)
+        tx["id"] = request_id
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+
+        self.logger.debug(f'Sending command: "{tx}".')
+        # empty delimiter frame, as sent by a REQ socket
+        await self.socket.send_multipart([b"", json.dumps(tx).encode("utf-8")])
+
+        try:
+            return await asyncio.wait_for(future, self.timeout if timeout is None else timeout)
+        except asyncio.TimeoutError:
+            self.logger.error(f'No reply for command "{tx}" within the timeout.')
+            raise
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def _receive_replies(self):
+        while True:
+            frames = await self.socket.recv_multipart(copy=False)
+            message = unpack_message(frames[1:])
+            self.logger.debug(f'Received reply: "{message}"')
+
+            future = self._pending.get(message.pop("id", None))
+            if future is None:
+                self.logger.warning(f"Dropped reply of an unknown (or timed out) request: {message}")
+            elif not future.done():
+                future.set_result(message)
+
+    def _handle_reply(self, tx, message):
+        if message.get("status") != "OK":
+            if message.get("data") == "Catched a cobs.DecodeError":
+                self.logger.error(f"Decoder Error. You likely have to restart the deamon on the BBB. (Sent: \"{tx}\")")
+                raise ValueError(f"Decoder Error. You likely have to restart the deamon on the BBB. (Sent: \"{tx}\")")
+            else:
+                self.logger.error(f'Sent: "{tx}". Received: "{message}"')
+                return None
+
+        return message.get("data")
@@ -1,6 +1,7 @@
 import json
 import logging
 import pathlib
+import time
 
 
 class RADIANTLowLevelInterface(object):
@@ -8,12 +9,68 @@ class RADIANTLowLevelInterface(object):
     NUM_CHANNELS = 24
     NUM_QUADS = 6
 
-    def __init__(self, remote_control):
+    # Registers which do not change as long as the board is not reset/reconfigured
+    # (board manager uid, revision, sampling rate). They are cached until invalidated.
+    IMMUTABLE_REGISTERS = frozenset([
+        BOARD_MANAGER_BASE_ADDRESS + 0x30,
+        BOARD_MANAGER_BASE_ADDRESS + 0x34,
+        BOARD_MANAGER_BASE_ADDRESS + 0x38,
+        BOARD_MANAGER_BASE_ADDRESS + 0x3C,
+        BOARD_MANAGER_BASE_ADDRESS + 0x5C,
+        BOARD_MANAGER_BASE_ADDRESS + 0xF0,
+        "BM_ID",
+        "BM_DATEVERSION",
+    ])
+    # Status registers (voltages, gpios, biases) which are cached for `status_ttl` seconds.
+    # All other registers (e.g. the uptime) are always read from the board.
+    STATUS_REGISTERS = frozenset(
+        [
+            BOARD_MANAGER_BASE_ADDRESS + 0x10,  # voltages
+            BOARD_MANAGER_BASE_ADDRESS + 0x14,
+            BOARD_MANAGER_BASE_ADDRESS + 0x18,
+            BOARD_MANAGER_BASE_ADDRESS + 0x1C,
+            BOARD_MANAGER_BASE_ADDRESS + 0x20,
+            BOARD_MANAGER_BASE_ADDRESS + 0xE0,  # pedestal voltages
+            BOARD_MANAGER_BASE_ADDRESS + 0xE4,
+            "BM_STATUS",
+        ]
+        + list(range(BOARD_MANAGER_BASE_ADDRESS + 0x40, BOARD_MANAGER_BASE_ADDRESS + 0x40 + 4 * NUM_QUADS, 4))
+        + list(range(BOARD_MANAGER_BASE_ADDRESS + 0x80, BOARD_MANAGER_BASE_ADDRESS + 0x80 + 4 * NUM_CHANNELS, 4))
+    )
+
+    # Commands which change cached registers: True -> drop the whole cache (reset / reconfiguration),
+    # False -> only drop the status registers
+    INVALIDATING_COMMANDS = {
+        ("radiant-board", "reset"): True,
+        ("station", "radiant_setup"): True,
+        ("station", "reset_radiant_board"): True,
+        ("radiant-board", "calSelect"): False,
+        ("radiant-board", "pedestal"): False,
+        ("radiant-board", "writeReg"): False,
+    }
+
+    def __init__(self, remote_control, status_ttl=1.0):
+        """
+
+        Parameters
+        ----------
+
+        remote_control: RemoteControl
+            Used to send the commands to the station.
+
+        status_ttl: float, optional (Default: 1.0)
+            Time (in seconds) for which status registers are cached. Set to 0 to
+            disable the caching of status registers.
+        """
         self.logger = logging.getLogger("RADIANTLowLevelInterface")
         self.rc = remote_control
+        self.status_ttl = status_ttl
+        self._register_cache = dict()
+        # also commands which are not sent through this interface invalidate the cache
+        self.rc.add_command_callback(self._invalidate_on_command)
 
     def board_manager_status(self):
-        value = self.read_register("BM_STATUS")
+        value = self._read_value("BM_STATUS")
         res = dict()
         res["FPGA_DONE"] = bool(value & (0x1 << 0))
         res["MGTDET"] = bool(value & (0x1 << 1))
@@ -26,33 +83,33 @@ class RADIANTLowLevelInterface(object):
         return res
 
     def board_manager_uid(self):
-        res = self.read_register(self.BOARD_MANAGER_BASE_ADDRESS + 0x30)
-        res += self.read_register(self.BOARD_MANAGER_BASE_ADDRESS + 0x34) << 32
-        res += self.read_register(self.BOARD_MANAGER_BASE_ADDRESS + 0x38) << 64
-        res += self.read_register(self.BOARD_MANAGER_BASE_ADDRESS + 0x3C) << 96
+        res = self._read_value(self.BOARD_MANAGER_BASE_ADDRESS + 0x30)
+        res += self._read_value(self.BOARD_MANAGER_BASE_ADDRESS + 0x34) << 32
+        res += self._read_value(self.BOARD_MANAGER_BASE_ADDRESS + 0x38) << 64
+        res += self._read_value(self.BOARD_MANAGER_BASE_ADDRESS + 0x3C) << 96
         return res
 
     def board_manager_uptime(self):
-        time_low = self.read_register(self.BOARD_MANAGER_BASE_ADDRESS + 0xE8)
-        time_high = self.read_register(self.BOARD_MANAGER_BASE_ADDRESS + 0xEC)
+        time_low = self._read_value(self.BOARD_MANAGER_BASE_ADDRESS + 0xE8)
+        time_high = self._read_value(self.BOARD_MANAGER_BASE_ADDRESS + 0xEC)
         return (time_high << 32) + time_low
 
     def board_manager_voltage_readback(self):
         res = dict()
         res["VOLTAGE_1V0"] = (
-            self.read_register(self.BOARD_MANAGER_BASE_ADDRESS + 0x10) / 65535 * 3.3
+            self._read_value(self.BOARD_MANAGER_BASE_ADDRESS + 0x10) / 65535 * 3.3
         )
         res["VOLTAGE_1V8"] = (
-            self.read_register(self.BOARD_MANAGER_BASE_ADDRESS + 0x14) / 65535 * 3.3
+            self._read_value(self.BOARD_MANAGER_BASE_ADDRESS + 0x14) / 65535 * 3.3
         )
         res["VOLTAGE_2V5"] = (
-            self.read_register(self.BOARD_MANAGER_BASE_ADDRESS + 0x18) / 65535 * 3.3
+            self._read_value(self.BOARD_MANAGER_BASE_ADDRESS + 0x18) / 65535 * 3.3
         )
         res["VOLTAGE_2V6"] = (
-            self.read_register(self.BOARD_MANAGER_BASE_ADDRESS + 0x1C) / 65535 * 3.3
+            self._read_value(self.BOARD_MANAGER_BASE_ADDRESS + 0x1C) / 65535 * 3.3
         )
         res["VOLTAGE_3V1"] = (
-            self.read_register(self.BOARD_MANAGER_BASE_ADDRESS + 0x20) / 65535 * 3.3
+            self._read_value(self.BOARD_MANAGER_BASE_ADDRESS + 0x20) / 65535 * 3.3
         )
         return res
 
@@ -74,9 +131,7 @@ class RADIANTLowLevelInterface(object):
         with open(filename, "r") as f:
             calib = json.load(f)
 
-        for ch in calib.keys():
-            for key in calib[ch].keys():
-                self.calibration_specifics_set(int(ch), int(key), calib[ch][key])
+        self.calibration_specifics_set_all(calib)
 
     def calibration_save(self):
         self.logger.info(f"Saving calibration for board {self.board_manager_uid():032x}")
@@ -84,9 +139,7 @@ class RADIANTLowLevelInterface(object):
             "radiant-calib", "save", {"uid": self.board_manager_uid()})
 
     def calibration_save_to_local(self):
-        calib = dict()
-        for ch in range(self.NUM_CHANNELS):
-            calib[ch] = self.calibration_specifics_get(ch)
+        calib = self.calibration_specifics_get_all()
 
         filename = pathlib.Path(__file__).parent / ".." / ".." / "calib" / \
             f"cal_{self.board_manager_uid():032x}.json"
@@ -98,6 +151,7 @@ class RADIANTLowLevelInterface(object):
 
 
     def calibration_specifics_get(self, channel):
+        self._check_not_in_batch("calibration_specifics_get")
         # the original dictionary uses int as keys which do not pass through the JSON sender
         data = self.rc.send_command("radiant-calib", "lab4_specifics", {"lab": channel})
         res = dict()
@@ -105,6 +159,24 @@ class RADIANTLowLevelInterface(object):
             res[int(key)] = data[key]
         return res
 
+    def calibration_specifics_get_all(self, channels=None):
+        """
+        Returns the specifics of several channels (default: all) as {channel: {key: value}}
+        with a single command.
+        """
+        self._check_not_in_batch("calibration_specifics_get_all")
+        if channels is None:
+            channels = range(self.NUM_CHANNELS)
+        data = self.rc.send_command(
+            "station", "radiant_calibration_specifics_get", {"channels": list(channels)})
+        if data is None:
+            return None
+
+        res = dict()
+        for ch in data.keys():
+            res[int(ch)] = {int(key): value for key, value in data[ch].items()}
+        return res
+
     def calibration_specifics_reset(self, channel):
         self.rc.send_command("radiant-calib", "lab4_reset_specifics", {"lab": channel})
 
@@ -115,6 +187,14 @@ class RADIANTLowLevelInterface(object):
             {"lab": channel, "key": key, "value": value},
         )
 
+    def calibration_specifics_set_all(self, specifics):
+        """
+        Sets the specifics given as {channel: {key: value}} with a single command,
+        e.g. a register range of one channel or a complete calibration.
+        """
+        self.rc.send_command(
+            "station", "radiant_calibration_specifics_set", {"specifics": specifics})
+
     def calram_base(self):
         return self.rc.send_command("radiant-calram", "get_base")
 
@@ -158,7 +238,24 @@ class RADIANTLowLevelInterface(object):
         )
 
     def dna(self):
-        return int(self.rc.send_command("radiant-board", "dna"))
+        if "dna" not in self._register_cache:
+            self._check_not_in_batch("dna")
+            self._register_cache["dna"] = (int(self.rc.send_command("radiant-board", "dna")), None)
+
+        return self._register_cache["dna"][0]
+
+    def invalidate_register_cache(self, immutable=True):
+        """
+        Drops cached register values. Called for every command in `INVALIDATING_COMMANDS`
+        (reset, reconfiguration, writes), hence only needed if the board is changed otherwise.
+        With `immutable=False` only the status registers are dropped.
+        """
+        if immutable:
+            self._register_cache.clear()
+        else:
+            self._register_cache = {
+                key: entry for key, entry in self._register_cache.items() if entry[1] is None
+            }
 
     def lab4d_controller_automatch_phab(self, channel, match=1):
         self.rc.send_command(
@@ -217,10 +314,10 @@ class RADIANTLowLevelInterface(object):
     def pedestal_voltage_get(self):
         res = dict()
         res["VPEDLEFT"] = (
-            self.read_register(self.BOARD_MANAGER_BASE_ADDRESS + 0xE0) / 4095 * 3.3
+            self._read_value(self.BOARD_MANAGER_BASE_ADDRESS + 0xE0) / 4095 * 3.3
         )
         res["VPEDRIGHT"] = (
-            self.read_register(self.BOARD_MANAGER_BASE_ADDRESS + 0xE4) / 4095 * 3.3
+            self._read_value(self.BOARD_MANAGER_BASE_ADDRESS + 0xE4) / 4095 * 3.3
         )
         return res
 
@@ -228,7 +325,7 @@ class RADIANTLowLevelInterface(object):
         if quad < 0 or quad > self.NUM_QUADS - 1:
             raise ValueError(f"No quad {quad}")
 
-        value = self.read_register(self.BOARD_MANAGER_BASE_ADDRESS + 0x40 + 4 * quad)
+        value = self._read_value(self.BOARD_MANAGER_BASE_ADDRESS + 0x40 + 4 * quad)
         res = dict()
         res["SEL_CAL"] = bool(value & (0x1 << 0))
         res["ATT_LE"] = bool(value & (0x1 << 1))
@@ -240,15 +337,57 @@ class RADIANTLowLevelInterface(object):
         res["DIP_SWITCH_BIT1"] = bool(value & (0x1 << 7))
         return res
 
-    def read_register(self, addr):
-        return self.rc.send_command("radiant-board", "readReg", {"addr": addr})
+    def read_register(self, addr, use_cache=True):
+        # within a batch all commands have to be sent to keep the order of the results
+        if not use_cache or self.rc.in_batch or (
+                addr not in self.IMMUTABLE_REGISTERS and addr not in self.STATUS_REGISTERS):
+            return self.rc.send_command("radiant-board", "readReg", {"addr": addr})
+
+        value = self._cached_register(addr)
+        if value is not None:
+            return value
+
+        value = self.rc.send_command("radiant-board", "readReg", {"addr": addr})
+        if value is not None:
+            expires = None if addr in self.IMMUTABLE_REGISTERS else time.monotonic() + self.status_ttl
+            self._register_cache[addr] = (value, expires)
+
+        return value
 
     def trigger_diode_bias_get(self, channel):
         if channel < 0 or channel > self.NUM_CHANNELS - 1:
             raise ValueError(f"No channel {channel}")
 
         return (
-            self.read_register(self.BOARD_MANAGER_BASE_ADDRESS + 0x80 + 4 * channel)
+            self._read_value(self.BOARD_MANAGER_BASE_ADDRESS + 0x80 + 4 * channel)
             / 4095
             * 2.0
         )
+
+    def _cached_register(self, addr):
+        # returns None if the register is not cached (or expired)
+        if addr in self._register_cache:
+            value, expires = self._register_cache[addr]
+            if expires is None or time.monotonic() < expires:
+                return value
+        return None
+
+    def _check_not_in_batch(self, name):
+        if self.rc.in_batch:
+            raise RuntimeError(f"`{name}` processes the results of its commands and can not be used within a batch.")
+
+    def _invalidate_on_command(self, device, cmd):
+        if (device, cmd) in self.INVALIDATING_COMMANDS:
+            self.invalidate_register_cache(immutable=self.INVALIDATING_COMMANDS[(device, cmd)])
+
+    def _read_value(self, addr):
+        # Used by the helpers which process the register values: within a batch `read_register`
+        # only queues the command (and returns None), hence only cached values can be used.
+        if not self.rc.in_batch:
+            return self.read_register(addr)
+
+        value = self._cached_register(addr)
+        if value is None:
+            name = addr if isinstance(addr, str) else hex(addr)
+            raise RuntimeError(f"Register {name} is not cached and can not be processed within a batch.")
+        return value
@@ -1,3 +1,4 @@
+import gzip
 import json
 import logging
 import zmq
@@ -5,8 +6,10 @@ import socket
 import pickle
 import struct
 import threading
+import time
 
 from stationrc.bbb import Station
+from stationrc.common import unpack_message
 
 def get_ip():
     soc = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
@@ -33,64 +36,267 @@ def handleLogRecord(record):
 
 
 class RemoteControl(object):
-    def __init__(self, host, port, logger_port, run_local=False):
+    # Commands which only read from the station. They are sent again after a timeout.
+    IDEMPOTENT_COMMANDS = [
+        ("radiant-board", "dna"),
+        ("radiant-board", "identify"),
+        ("radiant-board", "readReg"),
+        ("radiant-calib", "getPedestals"),
+        ("radiant-calib", "lab4_specifics"),
+        ("radiant-calram", "get_base"),
+        ("radiant-calram", "numRolls"),
+        ("radiant-dma", "get_base"),
+        ("radiant-labc", "scan_dump"),
+        ("station", "monitoring_latest"),
+        ("station", "monitoring_since"),
+        ("station", "radiant_calibration_specifics_get"),
+        ("controller-board", "#MONITOR"),
+    ]
+
+    # Commands which can take (much) longer than the timeout. They wait forever.
+    LONG_COMMANDS = [
+        ("radiant-calib", "load"),
+        ("radiant-calib", "save"),
+        ("radiant-calib", "updatePedestals"),
+        ("radiant-labc", "automatch_phab"),
+        ("radiant-labc", "autotune_vadjp"),
+        ("station", "daq_record_data"),
+        ("station", "daq_run_wait"),
+        ("station", "radiant_calib_isels"),
+        ("station", "radiant_get_time_run"),
+        ("station", "radiant_setup"),
+        ("station", "radiant_tune_initial"),
+        ("station", "reset_radiant_board"),
+    ]
+
+    def __init__(self, host, port, logger_port, run_local=False, timeout=None, retries=3):
+        """
+
+        Parameters
+        ----------
+
+        host: str
+            Ip address of the station
+
+        port: int
+            Port of the station
+
+        logger_port: int or None
+            Local port on which the log messages of the station are received. If None,
+            the log messages of the station are not received.
+
+        run_local: bool, optional (Default: False)
+            Execute the commands directly (on the BBB) instead of sending them to the station
+
+        timeout: float, optional (Default: None)
+            Time (in seconds) to wait for the reply of a command (except for `LONG_COMMANDS`).
+            None means wait forever. After a timeout the socket is rebuilt and
+            `IDEMPOTENT_COMMANDS` are sent again (up to `retries` times with increasing
+            waiting time in between). Otherwise a `TimeoutError` is raised. Note that the
+            station may still execute the command after the timeout (e.g. when it was
+            queued behind a long command of another client), i.e. the state of the station
+            is unknown after a `TimeoutError`.
+
+        retries: int, optional (Default: 3)
+            Number of retries for `IDEMPOTENT_COMMANDS` after a timeout.
+        """
         self.logger = logging.getLogger("RemoteControl")
         self.run_local = run_local
+        self.timeout = timeout
+        self.retries = retries
+        self._batch = None
+        self._recording = None
+        self._command_callbacks = list()
 
         if self.run_local:
             self.station = Station(start_thread=False)
         else:
 
             self.context = zmq.Context()
-            self.socket = self.context.socket(zmq.REQ)
-            socket_add = f"tcp://{host}:{port}"
-            self.logger.info(f"Connect to socket: '{socket_add}'.")
-            self.socket.connect(socket_add)
+            self._socket_address = f"tcp://{host}:{port}"
+            self.logger.info(f"Connect to socket: '{self._socket_address}'.")
+            self.socket = self._connect()
 
-            try:
-                self.logger_socket = socket.socket()
-                self.logger_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-                self.logger_socket.bind(("", logger_port))  # bind to all interfaces
-                self.logger.info(f"Listening to logging on port {logger_port}")
+            self.listening = False
+            if logger_port is None:
+                self._has_set_logger = True
+            else:
+                try:
+                    self.logger_socket = socket.socket()
+                    self.logger_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                    self.logger_socket.bind(("", logger_port))  # bind to all interfaces
+                    self.logger.info(f"Listening to logging on port {logger_port}")
 
-                # configure how many client the server can listen simultaneously
-                self.logger_socket.listen(10)
+                    # configure how many client the server can listen simultaneously
+                    self.logger_socket.listen(10)
 
-                self.listening = True
-                self.thr_logger = threading.Thread(
-                    target=self.receive_logger,  daemon=True)  # daemon=True -> dies when program finishes
-                self.thr_logger.start()
+                    self.listening = True
+                    self.thr_logger = threading.Thread(
+                        target=self.receive_logger,  daemon=True)  # daemon=True -> dies when program finishes
+                    self.thr_logger.start()
+
+                    self._logger_port = logger_port
+                    self._has_set_logger = False
+                except OSError:
+                    self._has_set_logger = True  # do not set logger handler on the remote side
+
+    def close(self):
+        """ Closes the sockets (and stops the recording). The remote control can not be used anymore. """
+        self.stop_recording()
+        if self.run_local:
+            return
 
-                self._logger_port = logger_port
-                self._has_set_logger = False
+        self.socket.close()
+        self.context.term()
+        if self.listening:
+            self.listening = False
+            try:
+                self.logger_socket.shutdown(socket.SHUT_RDWR)  # wakes up `receive_logger`
             except OSError:
-                self._has_set_logger = True  # do not set logger handler on the remote side
+                pass
+            self.logger_socket.close()
+
+    def batch(self, compress=False):
+        """
+        Context manager to collect commands and send them in a single message.
+
+        Within the context `send_command` only queues the command and returns None.
+        When the context is left, all commands are executed in order on the station and
+        their results are available as `results` of the returned batch object. If any
+        command failed, a `RuntimeError` is raised (after all commands were executed).
+
+            with rc.batch() as batch:
+                rc.send_command("radiant-labc", "stop")
+                rc.send_command("radiant-calram", "numRolls")
+            num_rolls = batch.results[-1]
+
+        A batch opened within another batch joins the outer one (its `results`
+        stay None).
+        """
+        return CommandBatch(self, compress=compress)
+
+    @property
+    def in_batch(self):
+        return self._batch is not None
+
+    def add_command_callback(self, callback):
+        """ `callback(device, cmd)` is called for every command before it is sent (or queued in a batch). """
+        self._command_callbacks.append(callback)
 
-    def send_command(self, device, cmd, data=None):
+    def send_command(self, device, cmd, data=None, compress=False, timeout=None):
+        """
+        Executes a command on the station and returns its result.
+
+        Results containing numpy arrays are transferred as binary frames (see
+        `stationrc.common.pack_message`); with `compress` these frames are compressed.
+        With `timeout` (in seconds) the default timeout of the command is overwritten
+        (ignored within a batch).
+        """
         tx = {"device": device, "cmd": cmd}
         if data is not None:
             tx["data"] = json.dumps(data)
+        if compress:
+            tx["compress"] = True
+
+        for callback in self._command_callbacks:
+            callback(device, cmd)
+
+        if self._batch is not None:
+            self._batch.commands.append(tx)
+            return None
+
+        return self._handle_reply(tx, self._execute(tx, timeout))
+
+    def send_commands(self, commands, compress=False):
+        """
+        Executes a list of (device, cmd, data) tuples in one message and returns the
+        list of results.
+        """
+        with self.batch(compress=compress) as batch:
+            for device, cmd, data in commands:
+                self.send_command(device, cmd, data)
+        return batch.results
+
+    def start_recording(self, filename):
+        """
+        Records all commands and their replies into `filename` (gzip compressed stream of
+        pickled (command, reply) tuples). Commands of a batch are recorded individually.
+        The recording can be replayed with `ReplayRemoteControl`.
+        """
+        self.stop_recording()
+        self.logger.info(f"Recording commands to {filename}")
+        self._recording = gzip.open(filename, "wb")
 
+    def stop_recording(self):
+        if self._recording is not None:
+            self._recording.close()
+            self._recording = None
+
+    def _record(self, tx, message):
+        if "batch" in tx:
+            if message.get("status") == "OK":
+                for sub_tx, sub_message in zip(tx["batch"], message["data"]):
+                    self._record(sub_tx, sub_message)
+            return
+
+        pickle.dump((tx, message), self._recording, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _connect(self):
+        socket = self.context.socket(zmq.REQ)
+        socket.setsockopt(zmq.LINGER, 0)
+        socket.connect(self._socket_address)
+        return socket
+
+    def _command_timeout(self, tx):
+        commands = [(sub_tx["device"], sub_tx["cmd"]) for sub_tx in tx.get("batch", [tx])]
+        if any(command in self.LONG_COMMANDS for command in commands):
+            return None
+        return self.timeout
+
+    def _request(self, tx, timeout):
+        # "Lazy pirate": after a timeout the REQ socket can not be used anymore, replace it.
+        # Late replies to the old socket are discarded by the station.
+        commands = [(sub_tx["device"], sub_tx["cmd"]) for sub_tx in tx.get("batch", [tx])]
+        retries = self.retries if all(command in self.IDEMPOTENT_COMMANDS for command in commands) else 0
+
+        for attempt in range(retries + 1):
+            self.socket.send_json(tx)
+            if timeout is None or self.socket.poll(int(timeout * 1000), zmq.POLLIN):
+                return unpack_message(self.socket.recv_multipart(copy=False))
+
+            self.logger.warning(f'No reply within {timeout} s for "{tx}" (attempt {attempt + 1} / {retries + 1}).')
+            self.socket.close()
+            self.socket = self._connect()
+            if attempt < retries:
+                time.sleep(min(0.5 * 2 ** attempt, 5))
+
+        raise TimeoutError(f'No reply from {self._socket_address} within {timeout} s for "{tx}"')
+
+    def _execute(self, tx, timeout=None):
         if self.run_local:
-            if device == "controller-board":
-                raise NotImplementedError("You are running locally, you can not execute "
-                                          "commannds on the controller board")
+            for sub_tx in tx.get("batch", [tx]):
+                if sub_tx["device"] == "controller-board":
+                    raise NotImplementedError("You are running locally, you can not execute "
+                                              "commannds on the controller board")
             status, data = self.station.parse_message_execute_command(tx)
             message = {"status": status}
             if data is not None:
                 message["data"] = data
         else:
-            if device != "controller-board" and not self._has_set_logger:
+            if tx.get("device") != "controller-board" and not self._has_set_logger:
                 self._has_set_logger = True
                 self.set_remote_logger_handler()
 
             self.logger.debug(f'Sending command: "{tx}".')
-            self.socket.send_json(tx)
-
-            message = self.socket.recv_json()
+            message = self._request(tx, self._command_timeout(tx) if timeout is None else timeout)
 
         self.logger.debug(f'Received reply: "{message}"')
+        if self._recording is not None:
+            self._record(tx, message)
+
+        return message
 
+    def _handle_reply(self, tx, message):
         if "status" not in message or message["status"] != "OK":
             if "data" in message and message["data"] == "Catched a cobs.DecodeError":
                 self.logger.error(f"Decoder Error. You likely have to restart the deamon on the BBB. (Sent: \"{tx}\")")
@@ -104,6 +310,14 @@ class RemoteControl(object):
 
         return message["data"]
 
+    def _send_batch(self, commands, compress=False):
+        tx = {"batch": commands}
+        if compress:
+            tx["compress"] = True
+
+        message = self._execute(tx)
+        return _batch_results(self, commands, message)
+
     def receive_logger(self):
 
         self.conn, _ = self.logger_socket.accept()  # accept new connection
@@ -127,3 +341,48 @@ class RemoteControl(object):
         self.logger.info("Set remote logger handler for radiant")
         return self.send_command("radiant-board", "add_logger_handler",
                                  {"host": get_ip(), "port": self._logger_port})
+
+
+def _batch_results(remote_control, commands, message):
+    # returns the results of the commands of a batch, raises if any of them failed
+    if message.get("status") != "OK":
+        remote_control.logger.error(f'Sent batch of {len(commands)} commands. Received: "{message}"')
+        raise RuntimeError(f'Batch of {len(commands)} commands failed: "{message}"')
+
+    results = [remote_control._handle_reply(sub_tx, sub_message)
+               for sub_tx, sub_message in zip(commands, message["data"])]
+
+    failed = [(sub_tx, sub_message) for sub_tx, sub_message in zip(commands, message["data"])
+              if sub_message.get("status") != "OK"]
+    if len(failed):
+        raise RuntimeError(f"{len(failed)} of {len(commands)} commands of a batch failed. "
+                           f'First: sent "{failed[0][0]}", received "{failed[0][1]}"')
+
+    return results
+
+
+class CommandBatch(object):
+    def __init__(self, remote_control, compress=False):
+        self.rc = remote_control
+        self.compress = compress
+        self.commands = list()
+        self.results = None
+        self._nested = False
+
+    def __enter__(self):
+        if self.rc._batch is not None:
+            self._nested = True
+        else:
+            self.rc._batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._nested:
+            return
+
+        self.rc._batch = None
+        if exc_type is None:
+            if len(self.commands):
+                self.results = self.rc._send_batch(self.commands, compress=self.compress)
+            else:
+                self.results = list()
@@ -0,0 +1,239 @@
+import collections
+import gzip
+import json
+import logging
+import numpy as np
+import pickle
+
+from stationrc.common import pack_message, unpack_message
+from .RemoteControl import RemoteControl
+
+
+def read_recording(filename):
+    """ Yields the (command, reply) tuples of a recording (see `RemoteControl.start_recording`). """
+    with gzip.open(filename, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                break
+
+
+def _command_key(tx):
+    return tx["device"], tx["cmd"], tx.get("data")
+
+
+class OfflineRemoteControl(RemoteControl):
+    """
+    Base class for remote controls which answer the commands without a station. Sub-classes
+    implement `_execute_command` which returns the reply for a single command.
+    """
+    def __init__(self):
+        self.logger = logging.getLogger(type(self).__name__)
+        self.run_local = False
+        self._batch = None
+        self._recording = None
+        self._command_callbacks = list()
+        self._has_set_logger = True
+
+    def _execute(self, tx, timeout=None):
+        if "batch" in tx:
+            message = {"status": "OK", "data": [self._execute_command(sub_tx) for sub_tx in tx["batch"]]}
+        else:
+            message = self._execute_command(tx)
+
+        if self._recording is not None:
+            self._record(tx, message)
+
+        return message
+
+    def _execute_command(self, tx):
+        raise NotImplementedError
+
+
+class ReplayRemoteControl(OfflineRemoteControl):
+    """
+    Serves the replies of a recording (see `RemoteControl.start_recording`).
+
+    Replies are looked up by command (device, cmd and data). Identical commands get the
+    recorded replies in the recorded order; once all of them are used, the last reply is
+    repeated. Hence a replay is deterministic even if the replayed algorithm sends the
+    commands in a different order.
+
+    Only reads (`RemoteControl.IDEMPOTENT_COMMANDS` and `MEASUREMENT_COMMANDS`) need a recorded
+    reply. All other commands (writes) which were not recorded with the same data are
+    answered with "OK", such that a changed algorithm (e.g. setting different values) can be
+    replayed. With `strict` every command needs a recorded reply.
+    """
+    # commands which return a measurement (besides the `IDEMPOTENT_COMMANDS`)
+    MEASUREMENT_COMMANDS = [
+        ("radiant-labc", "autotune_vadjp"),
+        ("radiant-labc", "scan_width"),
+        ("station", "radiant_get_time_run"),
+    ]
+
+    def __init__(self, filename, strict=False):
+        super().__init__()
+        self.strict = strict
+        self.replies = collections.defaultdict(collections.deque)
+        self._last_replies = dict()
+        for tx, message in read_recording(filename):
+            self.replies[_command_key(tx)].append(message)
+
+        self.logger.info(f"Loaded {sum(len(r) for r in self.replies.values())} replies from {filename}")
+
+    def _is_read(self, tx):
+        command = (tx["device"], tx["cmd"])
+        return command in self.IDEMPOTENT_COMMANDS or command in self.MEASUREMENT_COMMANDS
+
+    def _execute_command(self, tx):
+        key = _command_key(tx)
+        if len(self.replies[key]):
+            self._last_replies[key] = self.replies[key].popleft()
+        elif key not in self._last_replies:
+            if self.strict or self._is_read(tx):
+                raise KeyError(f"No recorded reply for command {tx}")
+            self.logger.debug(f"No recorded reply for command {tx}, answer with OK.")
+            return {"status": "OK"}
+
+        return self._last_replies[key]
+
+
+class LAB4DModel(object):
+    """
+    Simple parametric model of the timing of the LAB4Ds of a RADIANT.
+
+    Per channel the seam sample depends linearly on the VadjP register (11), the slow
+    sample and the SSPin width on the average of the trims 257 - 382. The sum of all 128
+    sample lengths is one clock period, i.e., the middle samples absorb the remainder.
+    All parameters are drawn randomly (`seed`), measurements have a gaussian `noise` (ps).
+    """
+    NUM_CHANNELS = 24
+    SAMPLE_RATE_REGISTER = 0x400000 + 0xF0
+
+    def __init__(self, sample_rate=3200, noise=1.0, external_signal=False, seed=None):
+        self.sample_rate = sample_rate
+        self.noise = noise
+        self.external_signal = external_signal
+        self.rng = np.random.default_rng(seed)
+
+        self.nom_sample = 1 / sample_rate * 1e6
+        n = self.NUM_CHANNELS
+        self.seam_slope = self.rng.uniform(-1.0, -0.6, n)  # ps per VadjP unit
+        self.seam_zero = self.rng.uniform(1030, 1070, n)  # VadjP of the nominal seam
+        self.slow_slope = self.rng.uniform(-0.35, -0.25, n)  # ps per trim unit
+        self.slow_zero = self.rng.uniform(1080, 1140, n)  # trim of the nominal slow sample
+        self.width_zero = self.rng.uniform(1200, 1400, n)
+
+        self.reset()
+
+    def reset(self):
+        self.specifics = {ch: self._default_specifics() for ch in range(self.NUM_CHANNELS)}
+        self.applied = {ch: dict(self.specifics[ch]) for ch in range(self.NUM_CHANNELS)}
+        self.monitored = 0
+        self.quad = None
+
+    def _default_specifics(self):
+        specifics = {2: 0, 3: 0, 8: 2700, 11: 1000}
+        specifics.update({i: 1000 for i in range(256, 384)})
+        return specifics
+
+    def _average_trim(self, channel):
+        return np.mean([self.applied[channel][i] for i in range(257, 383)])
+
+    def cal_select(self, quad):
+        self.quad = quad
+
+    def mon_select(self, lab):
+        self.monitored = lab
+
+    def specifics_get(self, channels=None):
+        if channels is None:
+            channels = range(self.NUM_CHANNELS)
+        return {ch: self.specifics[ch] for ch in channels}
+
+    def specifics_reset(self, lab):
+        self.specifics[lab] = self._default_specifics()
+
+    def specifics_set(self, specifics):
+        for ch, values in specifics.items():
+            for key, value in values.items():
+                self.specifics[int(ch)][int(key)] = value
+
+    def read_register(self, addr):
+        if addr == self.SAMPLE_RATE_REGISTER:
+            return self.sample_rate
+        return 0
+
+    def scan_width(self, scanNum, trials=1):
+        channel = self.monitored % 12 + 12 * scanNum
+        width = self.width_zero[channel] - 4 * (self._average_trim(channel) - 1000)
+        return int(width + self.rng.normal(0, 4 * self.noise))
+
+    def update(self, lab4):
+        self.applied[lab4] = dict(self.specifics[lab4])
+
+    def time_run(self, frequency, trigs_per_roll=4):
+        times = np.zeros((self.NUM_CHANNELS, 128))
+        for ch in range(self.NUM_CHANNELS):
+            # the calibration signal is only routed to the selected quad
+            if not self.external_signal and (self.quad is None or (ch % 12) // 4 != self.quad % 3):
+                continue
+
+            seam = self.nom_sample + self.seam_slope[ch] * (self.applied[ch][11] - self.seam_zero[ch])
+            slow = self.nom_sample + self.slow_slope[ch] * (self._average_trim(ch) - self.slow_zero[ch])
+            times[ch] = (128 * self.nom_sample - seam - slow) / 126
+            times[ch, 0] = seam
+            times[ch, 127] = slow
+            times[ch] += self.rng.normal(0, self.noise, 128)
+
+        return times.astype(np.float32)
+
+
+class EmulatedRemoteControl(OfflineRemoteControl):
+    """
+    Answers the commands used for the tuning of the LAB4Ds with a `LAB4DModel`. All other
+    known commands (e.g. of the signal generator) are accepted and do nothing. The replies
+    are serialized like for a real station.
+    """
+    def __init__(self, model=None):
+        super().__init__()
+        self.model = model or LAB4DModel()
+        m = self.model
+
+        self.commands = {
+            ("radiant-board", "readReg"): m.read_register,
+            ("radiant-board", "monSelect"): m.mon_select,
+            ("radiant-board", "calSelect"): m.cal_select,
+            ("radiant-calib", "lab4_specifics"): lambda lab: m.specifics[lab],
+            ("radiant-calib", "lab4_specifics_set"): lambda lab, key, value: m.specifics_set({lab: {key: value}}),
+            ("radiant-calib", "lab4_reset_specifics"): m.specifics_reset,
+            ("radiant-labc", "update"): m.update,
+            ("radiant-labc", "autotune_vadjp"): lambda lab, initial: initial,
+            ("radiant-labc", "scan_width"): m.scan_width,
+            ("station", "radiant_calibration_specifics_get"): m.specifics_get,
+            ("station", "radiant_calibration_specifics_set"): m.specifics_set,
+            ("station", "radiant_get_time_run"): m.time_run,
+            ("station", "reset_radiant_board"): m.reset,
+        }
+        # all other commands of these devices are accepted and do nothing
+        self.devices = ["radiant-board", "radiant-calib", "radiant-calram", "radiant-dma",
+                        "radiant-labc", "radiant-sig-gen", "station"]
+
+    def _execute_command(self, tx):
+        key = (tx["device"], tx["cmd"])
+        data = json.loads(tx["data"]) if "data" in tx else dict()
+
+        if key in self.commands:
+            res = self.commands[key](**data)
+        elif tx["device"] in self.devices:
+            res = None
+        else:
+            return {"status": "UNKNOWN_DEV"}
+
+        message = {"status": "OK"}
+        if res is not None:
+            message["data"] = res
+
+        # serialize like the station does (e.g. integer keys become strings)
+        return unpack_message(pack_message(message))
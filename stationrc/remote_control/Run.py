@@ -1,3 +1,4 @@
+import concurrent.futures
 import pathlib
 
 import stationrc.common
@@ -38,12 +39,28 @@ class Run(object):
             print(f"{data_dir} does not exist. Create it ...")
             data_dir.mkdir(parents=True)
 
-        self.station.retrieve_data(res["data_dir"], target_dir=data_dir, delete_src=delete_src)
-
         if rootify:
-            stationrc.common.rootify(
-                data_dir,
-                self.station.station_conf["daq"]["mattak_directory"],
-            )
+            self._retrieve_and_rootify(res["data_dir"], data_dir, delete_src)
+        else:
+            self.station.retrieve_data(res["data_dir"], target_dir=data_dir, delete_src=delete_src)
+
+        return data_dir
+
+    def _retrieve_and_rootify(self, src, data_dir, delete_src=False):
+        # Transfer the run directory by directory and convert each directory while the next
+        # one is transferred. The (large) waveforms come last.
+        mattak_dir = self.station.station_conf["daq"]["mattak_directory"]
+        with concurrent.futures.ThreadPoolExecutor(
+                max_workers=len(stationrc.common.util.ROOTIFY_FILE_TYPES)) as executor:
+            futures = []
+            for file_type, (sub_dir, _, _) in stationrc.common.util.ROOTIFY_FILE_TYPES.items():
+                self.station.retrieve_data(f"{src}/{sub_dir}", target_dir=data_dir / sub_dir, delete_src=delete_src)
+                futures.append(executor.submit(
+                    stationrc.common.rootify_convert, data_dir, file_type, mattak_dir))
+
+            # all other files of the run
+            self.station.retrieve_data(src, target_dir=data_dir, delete_src=delete_src)
+            for future in futures:
+                future.result()
 
-        return data_dir
\ No newline at end of file
+        stationrc.common.rootify_combine(data_dir, mattak_dir)
\ No newline at end of file
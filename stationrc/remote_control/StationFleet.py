@@ -0,0 +1,139 @@
+import json
+import logging
+import threading
+import time
+
+from .RemoteControl import RemoteControl
+from .VirtualStation import VirtualStation, load_virtual_station_conf
+from .utils import convert_alias_to_ip, get_station_hosts
+
+
+class StationFleet(object):
+    """
+    Runs the same queries on several stations in parallel.
+
+    Every station is queried in its own thread with its own `VirtualStation` (on a lightweight
+    `RemoteControl` without the listener for the log messages of the station). Hence, querying
+    all stations takes about as long as the slowest one. Stations which do not answer within
+    the timeout are reported as "TIMEOUT". Every command times out after the timeout of the
+    fleet as well, hence the thread of such a station ends after its current command.
+
+        fleet = StationFleet()  # all stations in `utils.host_aliases`
+        results = fleet.run({"revision": lambda station: station.radiant_revision()})
+    """
+    def __init__(self, hosts=None, timeout=60):
+        """
+
+        Parameters
+        ----------
+
+        hosts: list of str, optional (Default: None)
+            Ip addresses or aliases of the stations. If `None`, use all stations of
+            `utils.host_aliases`. Duplicates (e.g. two aliases of one station) are removed.
+
+        timeout: float, optional (Default: 60)
+            Time (in seconds) after which a station is given up.
+        """
+        self.logger = logging.getLogger("StationFleet")
+        self.timeout = timeout
+
+        if hosts is None or hosts == [None]:
+            hosts = list(get_station_hosts())
+
+        self.hosts = {}  # ip -> name
+        for host in hosts:
+            ip = convert_alias_to_ip(host)
+            if ip not in self.hosts:
+                self.hosts[ip] = host
+
+    def run(self, queries, timeout=None):
+        """
+        Runs the queries on all stations.
+
+        Parameters
+        ----------
+
+        queries: dict or callable
+            Function(s) which get a `VirtualStation` and return the result of the query.
+            The queries of one station run sequentially.
+
+        timeout: float, optional (Default: None)
+            Overwrite the timeout of the fleet (in seconds).
+
+        Returns
+        -------
+
+        results: dict
+            For each station (by name): {"host": ip, "status": "OK" | "ERROR" | "TIMEOUT",
+            "duration": seconds, "data": result(s) of the queries (a dict if `queries` is a dict)}.
+            For "ERROR" "data" holds the error message.
+        """
+        timeout = self.timeout if timeout is None else timeout
+
+        results = {}
+        threads = []
+        for ip, name in self.hosts.items():
+            results[name] = {"host": ip, "status": "TIMEOUT", "duration": None, "data": None}
+            thr = threading.Thread(
+                target=self._run_station, args=(ip, queries, results[name], timeout), daemon=True)
+            thr.start()
+            threads.append((name, thr))
+
+        deadline = time.time() + timeout
+        for name, thr in threads:
+            thr.join(max(0, deadline - time.time()))
+            if thr.is_alive():
+                self.logger.error(f"Station {name} did not answer within {timeout} s.")
+
+        # copy such that abandoned threads do not change the results anymore
+        return {name: dict(res) for name, res in results.items()}
+
+    def _run_station(self, ip, queries, result, timeout):
+        t0 = time.time()
+        rc = None
+        try:
+            rc = RemoteControl(ip, load_virtual_station_conf()["remote_control"]["port"], None,
+                               timeout=timeout, retries=0)
+            # no command may wait longer than the fleet
+            rc.LONG_COMMANDS = []
+            station = VirtualStation(host=ip, remote_control=rc)
+            if callable(queries):
+                data = queries(station)
+            else:
+                data = {key: query(station) for key, query in queries.items()}
+
+            result.update(status="OK", data=data)
+        except Exception as e:
+            self.logger.error(f"Query of {ip} failed: {e!r}")
+            result.update(status="ERROR", data=repr(e))
+        finally:
+            if rc is not None:
+                rc.close()
+
+        result["duration"] = time.time() - t0
+
+
+def print_fleet_results(results, as_json=False):
+    """ Prints the results of `StationFleet.run` as table (one row per station) or as JSON document. """
+    if as_json:
+        print(json.dumps(results, indent=2, default=str))
+        return
+
+    keys = []
+    for res in results.values():
+        if isinstance(res["data"], dict):
+            keys += [key for key in res["data"] if key not in keys]
+
+    rows = [["station", "host", "status", "time (s)"] + keys]
+    for name, res in results.items():
+        row = [name, res["host"], res["status"],
+               "-" if res["duration"] is None else f"{res['duration']:.1f}"]
+        if res["status"] == "OK" and isinstance(res["data"], dict):
+            row += [str(res["data"].get(key, "-")) for key in keys]
+        elif res["data"] is not None:
+            row += [str(res["data"])]
+        rows.append(row)
+
+    widths = [max(len(row[idx]) for row in rows if len(row) > idx) for idx in range(max(map(len, rows)))]
+    for row in rows:
+        print("  ".join(f"{value:<{width}}" for value, width in zip(row, widths)).rstrip())
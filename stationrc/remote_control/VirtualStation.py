@@ -9,8 +9,19 @@ from .RemoteControl import RemoteControl, get_ip
 from .utils import convert_alias_to_ip
 
 
+def load_virtual_station_conf():
+    """ Returns the config of the virtual station (`conf/virtual_station_conf.json` or the default). """
+    for suffix in ["", "_default"]:
+        config_file = pathlib.Path(__file__).parent / f"conf/virtual_station_conf{suffix}.json"
+        if config_file.exists():
+            with open(config_file, "r") as f:
+                return json.load(f)
+
+    raise FileNotFoundError("Could not find a config file.")
+
+
 class VirtualStation(object):
-    def __init__(self, load_calibration=False, force_run_mode=None, host=None):
+    def __init__(self, load_calibration=False, force_run_mode=None, host=None, remote_control=None):
         """
 
         Parameters
@@ -29,10 +40,17 @@ class VirtualStation(object):
         host: str, optional (Default: None)
             Specify the remote host ip address. If `None`, use ip
             from config file.
+
+        remote_control: RemoteControl, optional (Default: None)
+            Use this remote control instead of connecting to a station, e.g. a
+            `ReplayRemoteControl` or `EmulatedRemoteControl` to run without hardware.
+            `force_run_mode` and `host` are ignored.
         """
         self.logger = logging.getLogger("VirtualStation")
 
-        if force_run_mode is None:
+        if remote_control is not None:
+            run_local = remote_control.run_local
+        elif force_run_mode is None:
             # check if radiant device is available. If yes run locally
             run_local = os.path.exists("/dev/ttyRadiant")
         elif force_run_mode == "local":
@@ -44,25 +62,20 @@ class VirtualStation(object):
 
         self.logger.info(f"Run in {'local' if run_local else 'remote'} mode.")
 
-        self.station_conf = None
-        for suffix in ["", "_default"]:
-            config_file = pathlib.Path(__file__).parent / f"conf/virtual_station_conf{suffix}.json"
-            if config_file.exists():
-                with open(config_file, "r") as f:
-                    self.station_conf = json.load(f)
-                break
-
-        if self.station_conf is None:
-            raise FileNotFoundError("Could not find a config file.")
+        self.station_conf = load_virtual_station_conf()
 
         remote_host = host or self.station_conf["remote_control"]["host"]
         self.remote_host = convert_alias_to_ip(remote_host)
-        self.rc = RemoteControl(
-            self.remote_host,
-            self.station_conf["remote_control"]["port"],
-            self.station_conf["remote_control"]["logger_port"],
-            run_local=run_local
-        )
+        if remote_control is not None:
+            self.rc = remote_control
+        else:
+            self.rc = RemoteControl(
+                self.remote_host,
+                self.station_conf["remote_control"]["port"],
+                self.station_conf["remote_control"]["logger_port"],
+                run_local=run_local,
+                timeout=self.station_conf["remote_control"].get("timeout")
+            )
 
         self.radiant_low_level_interface = RADIANTLowLevelInterface(
             remote_control=self.rc
@@ -84,22 +97,31 @@ class VirtualStation(object):
         use_uart=False,
         read_header=False,
         read_pedestal=False,
+        binary=False,
+        compress=False,
     ):
-        return self.rc.send_command(
-            "station",
-            "daq_record_data",
-            {
-                "num_events": num_events,
-                "trigger_channels": trigger_channels,
-                "trigger_threshold": trigger_threshold,
-                "trigger_coincidence": trigger_coincidence,
-                "force_trigger": force_trigger,
-                "force_trigger_interval": force_trigger_interval,
-                "use_uart": use_uart,
-                "read_header": read_header,
-                "read_pedestal": read_pedestal,
-            },
-        )
+        """
+        Records events with radiant-try-event on the station.
+
+        With `binary` the arrays of the packets are transferred as raw binary data
+        (optionally zlib compressed with `compress`) instead of JSON text and are
+        returned as (read-only) numpy arrays instead of lists.
+        """
+        data = {
+            "num_events": num_events,
+            "trigger_channels": trigger_channels,
+            "trigger_threshold": trigger_threshold,
+            "trigger_coincidence": trigger_coincidence,
+            "force_trigger": force_trigger,
+            "force_trigger_interval": force_trigger_interval,
+            "use_uart": use_uart,
+            "read_header": read_header,
+            "read_pedestal": read_pedestal,
+        }
+        if binary:
+            data["as_list"] = False
+
+        return self.rc.send_command("station", "daq_record_data", data, compress=compress)
 
     def reset_radiant_board(self):
         return self.rc.send_command("station", "reset_radiant_board")
@@ -118,6 +140,17 @@ class VirtualStation(object):
         res = json.loads(data)
         return res
 
+    def get_controller_board_monitoring_latest(self):
+        """
+        Returns the latest record {"time": unix time, "data": monitoring} sampled by the station
+        (without accessing the controller board) or None.
+        """
+        return self.rc.send_command("station", "monitoring_latest")
+
+    def get_controller_board_monitoring_since(self, timestamp=0):
+        """ Returns the records sampled by the station after `timestamp` (unix time). """
+        return self.rc.send_command("station", "monitoring_since", {"timestamp": timestamp})
+
     def get_radiant_board_dna(self):
         return self.radiant_low_level_interface.dna()
 
@@ -130,6 +163,15 @@ class VirtualStation(object):
     def radiant_calselect(self, quad):
         return self.rc.send_command("radiant-board", "calSelect", {"quad": quad})
 
+    def radiant_get_time_run(self, frequency, trigs_per_roll=4):
+        """
+        Records the zero crossings on the station and returns the sample times (in ps)
+        as numpy array of shape (24, 128). Only the times are transferred.
+        """
+        return self.rc.send_command(
+            "station", "radiant_get_time_run",
+            {"frequency": frequency, "trigs_per_roll": trigs_per_roll})
+
     def radiant_pedestal_get(self):
         return self.rc.send_command("radiant-calib", "getPedestals", {"asList": True})
 
@@ -1,5 +1,8 @@
+from .AsyncRemoteControl import AsyncRemoteControl
 from .Run import Run
 from .RunConfig import RunConfig
+from .ReplayRemoteControl import EmulatedRemoteControl, LAB4DModel, ReplayRemoteControl
+from .StationFleet import StationFleet, print_fleet_results
 from .VirtualStation import VirtualStation
-from .tune import get_time_run, initial_tune
+from .tune import get_time_run, get_time_run_raw, initial_tune
 from .utils import plot_run_waveforms
@@ -25,11 +25,27 @@ def main(station, args):
 
     ok = dict()
 
-    for quad in args.quads:
-        chs, tuned = initial_tune(
-            station, quad, args.frequency, max_tries=args.max_iterations, external_signal=args.external,
-            tune_with_rolling_mean=args.average, tune_with_mean=args.tune_with_mean, exclude_channels=args.exclude_channels,
-            selected_channels=args.channel)
+    # The width tuning does not need the calibration signal: prepare the channels of all quads at once
+    quad_channels = {quad: get_channels_for_quad(quad) for quad in args.quads}
+    all_channels = [ch for quad in args.quads for ch in quad_channels[quad]]
+    initial_states, seamTuneNums, failed = prepare_channels(
+        station, all_channels, max_tries=args.max_iterations,
+        exclude_channels=args.exclude_channels, selected_channels=args.channel)
+    prepared = dict(zip(all_channels, zip(initial_states, seamTuneNums, failed)))
+
+    # With an external signal all channels see the signal and are tuned together.
+    # Otherwise the calibration signal can only be routed to one quad at the time.
+    if args.external:
+        groups = [(None, all_channels)]
+    else:
+        groups = [(quad, quad_channels[quad]) for quad in args.quads]
+
+    for quad, channels in groups:
+        istates, snums, fails = zip(*[prepared[ch] for ch in channels])
+        chs, tuned = tune_seam_and_slow(
+            station, channels, list(istates), list(snums), list(fails), quad=quad, frequency=args.frequency,
+            max_tries=args.max_iterations, external_signal=args.external, tune_with_rolling_mean=args.average,
+            tune_with_mean=args.tune_with_mean, strategy=getattr(args, "strategy", "heuristic"))
         for ch, t in zip(chs, tuned):
             ok[ch] = t
 
@@ -43,108 +59,101 @@ def main(station, args):
 
 
 def get_time_run(station, frequency, trigs_per_roll=4):
+    # The acquisition and conversion is executed on the station, only the times are transferred
+    return station.radiant_get_time_run(frequency, trigs_per_roll=trigs_per_roll)
+
+
+def get_time_run_raw(station, trigs_per_roll=4):
+    """
+    Records the zero crossings of all channels (driven from the client) and returns
+    the raw DMA readout with shape (24, 4096) together with the number of rolls.
+    Use `stationrc.common.time_run_from_dma` to convert it into times.
+    """
     NUM_CHANNELS = 24
 
-    station.radiant_low_level_interface.lab4d_controller_stop()
-    station.radiant_low_level_interface.calram_zero(zerocross_only=True)
-    station.radiant_low_level_interface.calram_mode(
-        mode=stationrc.radiant.LAB4_Calram.CalMode.NONE
-    )
-    station.radiant_low_level_interface.lab4d_controller_start()
-    # junk the first 4
-    station.radiant_low_level_interface.lab4d_controller_force_trigger(
-        block=True, num_trig=trigs_per_roll, safe=False
-    )
-    # swap the CalMode to zerocrossing
-    station.radiant_low_level_interface.calram_mode(
-        mode=stationrc.radiant.LAB4_Calram.CalMode.ZEROCROSSING
-    )
-    # Run to 384 samples, I dunno what happens at 512 yet, screw it.
-    for i in range(3 * trigs_per_roll):
+    # The acquisition is sent in two batches (the DMA descriptors need the calram base)
+    with station.rc.batch() as batch:
+        station.radiant_low_level_interface.lab4d_controller_stop()
+        station.radiant_low_level_interface.calram_zero(zerocross_only=True)
+        station.radiant_low_level_interface.calram_mode(
+            mode=stationrc.radiant.LAB4_Calram.CalMode.NONE
+        )
+        station.radiant_low_level_interface.lab4d_controller_start()
+        # junk the first 4
         station.radiant_low_level_interface.lab4d_controller_force_trigger(
-            block=True, num_trig=128, safe=False
+            block=True, num_trig=trigs_per_roll, safe=False
         )
-    station.radiant_low_level_interface.lab4d_controller_stop()
-
-    # This should check to make sure it's actually 384, which it *should* be.
-    # We're doing things in groups of 384 because it can't trip the ZC overflow
-    # limit.
-    numRolls = station.radiant_low_level_interface.calram_num_rolls()
-    station.radiant_low_level_interface.dma_enable(
-        mode=stationrc.radiant.RadDMA.calDmaMode
-    )
-    base = station.radiant_low_level_interface.calram_base()
-    for ch in range(NUM_CHANNELS):
-        station.radiant_low_level_interface.dma_set_descriptor(
-            channel=ch,
-            address=base + 4096 * 4 * ch,
-            length=4096,
-            increment=True,
-            final=(ch == (NUM_CHANNELS - 1)),
+        # swap the CalMode to zerocrossing
+        station.radiant_low_level_interface.calram_mode(
+            mode=stationrc.radiant.LAB4_Calram.CalMode.ZEROCROSSING
+        )
+        # Run to 384 samples, I dunno what happens at 512 yet, screw it.
+        for i in range(3 * trigs_per_roll):
+            station.radiant_low_level_interface.lab4d_controller_force_trigger(
+                block=True, num_trig=128, safe=False
+            )
+        station.radiant_low_level_interface.lab4d_controller_stop()
+
+        # This should check to make sure it's actually 384, which it *should* be.
+        # We're doing things in groups of 384 because it can't trip the ZC overflow
+        # limit.
+        station.radiant_low_level_interface.calram_num_rolls()
+        station.radiant_low_level_interface.dma_enable(
+            mode=stationrc.radiant.RadDMA.calDmaMode
         )
+        station.radiant_low_level_interface.calram_base()
+
+    numRolls = batch.results[-3]
+    base = batch.results[-1]
+
+    with station.rc.batch() as batch:
+        for ch in range(NUM_CHANNELS):
+            station.radiant_low_level_interface.dma_set_descriptor(
+                channel=ch,
+                address=base + 4096 * 4 * ch,
+                length=4096,
+                increment=True,
+                final=(ch == (NUM_CHANNELS - 1)),
+            )
+
+        station.radiant_low_level_interface.dma_begin()
+        station.radiant_low_level_interface.dma_read(length=4096 * 4 * NUM_CHANNELS)
 
-    station.radiant_low_level_interface.dma_begin()
     # Data comes in as 4096*4*numLabs bytes in little-endian format.
     # Convert it to 4096*numLabs uint32's.
     rawtime = np.frombuffer(
-        bytearray(
-            station.radiant_low_level_interface.dma_read(length=4096 * 4 * NUM_CHANNELS)
-        ),
+        bytearray(batch.results[-1]),
         dtype=np.uint32,
     )
-    # Now view it as an array of [numLabs][4096]
-    timeByLab = rawtime.reshape(NUM_CHANNELS, 4096)
-    # Building up the times is a little harder than the pedestals.
-    # The first thing we do is zero out the invalid seams. That way when we add everything,
-    # all we need to do is rescale the seam by 8/3s.
-    # The invalid seams are 0 and every (sample % 256) = 128 for *every trigger*.
-    # So if we have 4 triggers in a roll of 4096, the invalid seams are 0, 128, 384, 640, 896.
-    # and we only have 3/8 valid.
-
-    # NOTE: I could almost certainly do this by reshaping/transposing magic crap. Screw it for now.
-    for ch in range(NUM_CHANNELS):
-        # What we do depends on the record length. If we have 4 trigs per roll, it's
-        # 8 windows per record. If it's 2 trigs per roll, we have 16 windows per record.
-        samplesPerRecord = 4096 // trigs_per_roll
-        for i in range(trigs_per_roll):
-            # The first one is always invalid because we don't have the last when it arrives.
-            timeByLab[ch][samplesPerRecord * i] = 0
-            windowsPerRecord = samplesPerRecord / 128
-            # Now every (sample % 256) == 128 is invalid because we buffer them in case the
-            # next seam is invalid due to being the end of the record.
-            for j in range(int(windowsPerRecord / 2)):
-                timeByLab[ch][samplesPerRecord * i + 256 * j + 128] = 0
-
-    # We now reshape our times by window. 128 samples per window, 32 windows per roll.
-    # So we're now an array of [numLabs][32][128].
-    timeByWindow = timeByLab.reshape(NUM_CHANNELS, 32, 128)
-
-    # Sum along the window axis, because the samples within a window have the same time.
-    # We're now shape (24, 128)
-    timeByWindow = timeByWindow.sum(axis=1)
-
-    # convert to time. The denominator is number of windows in a roll, numerator is number of picoseconds/cycle.
-    convFactor = (1e12 / frequency) / (numRolls * 32)
-    # This has to be A = A*B because we're actually creating a new array
-    # since we're moving to floats.
-    timeByWindow = timeByWindow * convFactor
-
-    # Now rescale the seams, because the seams have lower statistics.
-    # This is the number of windows in a record (eg if 4 trigs = 8)
-    windowsPerRecord = 4096 / (trigs_per_roll * 128)
-    # This is the number of *valid* windows per record (e.g. if 4 trigs = 3)
-    validWindowsPerRecord = windowsPerRecord / 2 - 1
-    rescale = validWindowsPerRecord * trigs_per_roll / 32
-    # Transposing gets us shape (128, 24), and we can
-    # rescale all of the LABs automatically. This is just a loop over all LABs
-    # rescaling time 0. So if we had 4 trigs per roll, that means only 12/32 of
-    # the zerocrossings were nonzero, so we divide by 12/32 (or multiply by 32/12).
-    timeByWindow.transpose()[0] /= rescale
-    # and we're done
-    return timeByWindow
-
-
-def adjust_seam(seamSample, station, channel, nom_sample, seamTuneNum, mode="seam"):
+    return rawtime.reshape(NUM_CHANNELS, 4096), numRolls
+
+
+def secant_step(history, target, sign, max_step, min_step=1):
+    """
+    Estimates the register change to reach `target` from the last two (register, sample time)
+    pairs in `history` (secant method). The step is clamped to [min_step, max_step] (in magnitude).
+
+    Returns None if there is not enough history or the measured response does not have the
+    expected `sign` (e.g. because of noise). Then the heuristic step should be used.
+    """
+    if len(history) < 2:
+        return None
+
+    (x0, y0), (x1, y1) = history[-2:]
+    if x1 == x0 or y1 == y0 or np.sign((y1 - y0) / (x1 - x0)) != sign:
+        return None
+
+    step = (target - y1) * (x1 - x0) / (y1 - y0)
+    return int(np.sign(step) * np.clip(np.round(np.abs(step)), min_step, max_step))
+
+
+def adjust_seam(seamSample, station, channel, nom_sample, seamTuneNum, mode="seam", current_state=None,
+                history=None):
+    """
+    Changes the register `seamTuneNum` to move the seam sample (or mean sample) towards the nominal
+    sample length. If a `history` (list) is given, the (register, sample) pairs are appended to it
+    and the step is calculated with the secant method (see `secant_step`) if possible.
+    """
     # Build the delta. This is totally hacked together.
     # Decrease if too fast, increase if too slow.
     # Change by 3 if it's within 50, change by 7 if it's between 50-100,
@@ -178,7 +187,19 @@ def adjust_seam(seamSample, station, channel, nom_sample, seamTuneNum, mode="sea
         if mode == "mean" and s_diff > 0:
             delta = -1 * delta
 
-    cur = station.radiant_low_level_interface.calibration_specifics_get(channel)[seamTuneNum]
+    if current_state is None:
+        current_state = station.radiant_low_level_interface.calibration_specifics_get(channel)
+
+    cur = current_state[seamTuneNum]
+    if history is not None:
+        history.append((cur, seamSample))
+        # Same directions as for the heuristic above: with VadjP (11) the seam sample gets faster
+        # and the mean gets slower with increasing register value. VadjN (3) behaves opposite.
+        sign = (-1 if mode == "seam" else 1) * (-1 if seamTuneNum == 3 else 1)
+        step = secant_step(history, nom_sample, sign=sign, max_step=10)
+        if step is not None:
+            delta = step
+
     newVal = cur + delta
     # if newVal < (self.nomSample*1.28):
     #    print("hmm feedback got to small. let's try something random!")
@@ -195,7 +216,8 @@ def adjust_seam(seamSample, station, channel, nom_sample, seamTuneNum, mode="sea
         channel, seamTuneNum, newVal)
 
 
-def adjust_slow(slowSample, slow_step, station, channel, nom_sample, slow_slow_factor, slow_fast_factor):
+def adjust_slow(slowSample, slow_step, station, channel, nom_sample, slow_slow_factor, slow_fast_factor,
+                current_state=None, history=None):
     if slowSample > (nom_sample * slow_slow_factor):
         slow_step = np.abs(slow_step)
         logger.debug(f"Need to speed up slow sample for channel {channel}")
@@ -203,27 +225,31 @@ def adjust_slow(slowSample, slow_step, station, channel, nom_sample, slow_slow_f
         slow_step *= -1
         logger.debug(f"Need to slow down slow sample for channel {channel}")
 
-    current_state = station.radiant_low_level_interface.calibration_specifics_get(channel)
+    if current_state is None:
+        current_state = station.radiant_low_level_interface.calibration_specifics_get(channel)
 
-    oldavg = 0
-    for i in range(257, 383):
-        old = current_state[i]
-        oldavg += old
-        station.radiant_low_level_interface.calibration_specifics_set(
-            channel, i, int(old + slow_step))  # Need to convert to int since might default to np.int64
+    if history is not None:
+        history.append((sum(current_state[i] for i in range(257, 383)) / 126, slowSample))
+        # The slow sample gets faster when the other trims are increased
+        target = nom_sample * (slow_slow_factor + slow_fast_factor) / 2
+        step = secant_step(history, target, sign=-1, max_step=2.5 * np.abs(slow_step))
+        if step is not None:
+            slow_step = step
 
-    oldavg = oldavg / 126
+    # Need to convert to int since might default to np.int64
+    new_state = {i: int(current_state[i] + slow_step) for i in range(257, 383)}
+    station.radiant_low_level_interface.calibration_specifics_set_all({channel: new_state})
+
+    oldavg = sum(current_state[i] for i in range(257, 383)) / 126
     logger.info(f"LAB{channel:<2}: Current slow is {slowSample:.2f} ps ({oldavg} -> {oldavg + slow_step})")
 
     return oldavg + slow_step
 
 
 def restore_inital_state(station, channel, state):
-    for key in state:
-        station.radiant_low_level_interface.calibration_specifics_set(
-                    channel, key, state[key])
-
-    station.radiant_low_level_interface.lab4d_controller_update(channel)
+    with station.rc.batch():
+        station.radiant_low_level_interface.calibration_specifics_set_all({channel: state})
+        station.radiant_low_level_interface.lab4d_controller_update(channel)
     logger.error(f"Initial tune failed for channel {channel}! Restored initial state.")
 
 
@@ -302,71 +328,131 @@ def setup_channel(station, channel):
         logger.info(f"LAB{channel:<2}: Defaults say to use the DLL")
         seamTuneNum = 11
 
-    station.radiant_low_level_interface.lab4d_controller_update(channel)
-
-    val = station.radiant_low_level_interface.lab4d_controller_autotune_vadjp(channel,
-            station.radiant_low_level_interface.calibration_specifics_get(channel)[8])
+    # the batch raises if a command failed, skip the channel (like for a None result) and continue
+    try:
+        with station.rc.batch() as batch:
+            station.radiant_low_level_interface.lab4d_controller_update(channel)
+            station.radiant_low_level_interface.lab4d_controller_autotune_vadjp(channel, initial_state[8])
+    except RuntimeError as e:
+        logger.error(f"LAB{channel}: lab4d_controller_autotune_vadjp failed ({e}). Skip this channel.")
+        return initial_state, None
 
+    val = batch.results[-1]
     if val is None:
         logger.error(f"LAB{channel}: The result of lab4d_controller_autotune_vadjp is None. Something is wrong.")
         return initial_state, None
 
-    station.radiant_low_level_interface.calibration_specifics_set(
-        channel, 8, val)
+    with station.rc.batch():
+        station.radiant_low_level_interface.calibration_specifics_set(
+            channel, 8, val)
 
-    station.radiant_low_level_interface.lab4d_controller_update(channel)
+        station.radiant_low_level_interface.lab4d_controller_update(channel)
 
-    station.radiant_low_level_interface.monselect(channel)
-    station.radiant_low_level_interface.lab4d_controller_tmon_set(
-        channel, stationrc.radiant.LAB4_Controller.tmon["SSPin"]
-    )
+        station.radiant_low_level_interface.monselect(channel)
+        station.radiant_low_level_interface.lab4d_controller_tmon_set(
+            channel, stationrc.radiant.LAB4_Controller.tmon["SSPin"]
+        )
 
     return initial_state, seamTuneNum
 
 
-def tuned_width(station, channel, target_width, max_tries, seamTuneNum, TRY_REG_3_FOR_FAILED_DLL):
-    scan = 1 if channel > 11 else 0
-    width = station.radiant_low_level_interface.lab4d_controller_scan_width(scan)
-    logger.info(f"LAB{channel:<2}: Initial SSPin width is {width}, target is below {target_width}")
+def scan_widths(station, channels):
+    """
+    Measures the SSPin widths of several channels with a single message.
 
-    if width > 1800:
-        logger.warning(f"LAB{channel} DLL seems broken, disabling (width = {width})")
-        # try hack
-        station.radiant_low_level_interface.lab4d_controller_write_register(
-            channel, address=2, value=1024
-        )
+    Returns
+    -------
+
+    widths: dict
+        {channel: width}
+    """
+    with station.rc.batch() as batch:
+        for channel in channels:
+            station.radiant_low_level_interface.monselect(channel)
+            station.radiant_low_level_interface.lab4d_controller_scan_width(1 if channel > 11 else 0)
+
+    # every second result is a width, the others belong to monselect
+    return dict(zip(channels, batch.results[1::2]))
+
+
+def tune_widths(station, channels, seamTuneNums, target_width, max_tries, TRY_REG_3_FOR_FAILED_DLL):
+    """
+    Tunes the SSPin width of several channels simultaneously.
+
+    In each iteration the trims of all channels which are not yet tuned are updated
+    together and their widths are measured in one batch.
+
+    Returns
+    -------
+
+    passed: list of bools
+        Whether the width of a channel was tuned within `max_tries`.
+
+    seamTuneNums: list of ints
+        The registers to tune the seam with (changes to 3 for channels with a broken DLL).
+    """
+    max_tries = {channel: max_tries for channel in channels}
+    seamTuneNums = dict(zip(channels, seamTuneNums))
+
+    widths = scan_widths(station, channels)
+    for channel in channels:
+        logger.info(f"LAB{channel:<2}: Initial SSPin width is {widths[channel]}, target is below {target_width}")
+
+    broken = [channel for channel in channels if widths[channel] > 1800]
+    if len(broken):
+        with station.rc.batch():
+            for channel in broken:
+                logger.warning(f"LAB{channel} DLL seems broken, disabling (width = {widths[channel]})")
+                # try hack
+                station.radiant_low_level_interface.lab4d_controller_write_register(
+                    channel, address=2, value=1024
+                )
         time.sleep(0.5)
-        width = station.radiant_low_level_interface.lab4d_controller_scan_width(scan)
-        station.radiant_low_level_interface.calibration_specifics_set(channel, 2, 1024)
-        station.radiant_low_level_interface.lab4d_controller_update(channel)
-        logger.info(f"SSPin width after disabling DLL: {width}")
-        if TRY_REG_3_FOR_FAILED_DLL:
-            seamTuneNum = 3
-            max_tries *= 3
-            logger.info("Switching to VadjN")
-    else:
-        logger.debug("DLL is okay")
+        widths.update(scan_widths(station, broken))
 
-    curTry = 0
+        with station.rc.batch():
+            station.radiant_low_level_interface.calibration_specifics_set_all(
+                {channel: {2: 1024} for channel in broken})
+            for channel in broken:
+                station.radiant_low_level_interface.lab4d_controller_update(channel)
 
-    while width > target_width and curTry < max_tries:
-        newAvg = 0
-        current_state = station.radiant_low_level_interface.calibration_specifics_get(channel)
+        for channel in broken:
+            logger.info(f"LAB{channel:<2}: SSPin width after disabling DLL: {widths[channel]}")
+            if TRY_REG_3_FOR_FAILED_DLL:
+                seamTuneNums[channel] = 3
+                max_tries[channel] *= 3
+                logger.info(f"LAB{channel:<2}: Switching to VadjN")
+
+    tries = {channel: 0 for channel in channels}
+
+    def needs_tuning(channel):
+        return widths[channel] > target_width and tries[channel] < max_tries[channel]
+
+    active = [channel for channel in channels if needs_tuning(channel)]
+    while len(active):
+        current_states = station.radiant_low_level_interface.calibration_specifics_get_all(active)
 
         # register range to address the samples, only changes the middle samples... hence not 128
-        for i in range(257, 383):
-            newval = current_state[i] + 25
-            station.radiant_low_level_interface.calibration_specifics_set(
-                channel, i, newval)
-            newAvg += newval
+        new_states = {
+            channel: {i: int(current_states[channel][i] + 25) for i in range(257, 383)}
+            for channel in active
+        }
+        with station.rc.batch():
+            station.radiant_low_level_interface.calibration_specifics_set_all(new_states)
+            for channel in active:
+                station.radiant_low_level_interface.lab4d_controller_update(channel)
 
-        station.radiant_low_level_interface.lab4d_controller_update(channel)
         time.sleep(0.1)
-        width = station.radiant_low_level_interface.lab4d_controller_scan_width(scan)
-        logger.info(f"New SSPin width (avg {newAvg / 126}): {width} (try: {curTry})")
-        curTry += 1
+        widths.update(scan_widths(station, active))
+        for channel in active:
+            logger.info(f"LAB{channel:<2}: New SSPin width (avg {sum(new_states[channel].values()) / 126}): "
+                        f"{widths[channel]} (try: {tries[channel]})")
+            tries[channel] += 1
+
+        active = [channel for channel in active if needs_tuning(channel)]
 
-    return curTry, seamTuneNum
+    passed = [tries[channel] < max_tries[channel] for channel in channels]
+    return passed, [seamTuneNums[channel] for channel in channels]
 
 
 def get_channels_for_quad(quad):
@@ -400,7 +486,8 @@ def select_channels(station, channels_in_quad, exclude_channels, selected_channe
     return initial_states, seamTuneNums
 
 def initial_tune(station, quad, frequency=510, max_tries=50, bad_lab=False, external_signal=False,
-                 tune_with_rolling_mean=False, tune_with_mean=False, exclude_channels=[], selected_channels=[]):
+                 tune_with_rolling_mean=False, tune_with_mean=False, exclude_channels=[], selected_channels=[],
+                 strategy="heuristic"):
     """
     Time tuning algorithm
 
@@ -435,6 +522,10 @@ def initial_tune(station, quad, frequency=510, max_tries=50, bad_lab=False, exte
         If true, first tune using the mean width of all samples instead of the seam and slow.
         (Default: False)
 
+    strategy : str
+        "heuristic" (fixed step sizes) or "secant" (step sizes estimated from the previous
+        iterations). (Default: "heuristic")
+
     Returns
     -------
 
@@ -443,9 +534,94 @@ def initial_tune(station, quad, frequency=510, max_tries=50, bad_lab=False, exte
 
     passed : list of bools
         List of whether a channel was tuned successful.
+
+    See Also
+    --------
+
+    prepare_channels, tune_seam_and_slow: The two phases of the tuning.
+    """
+    channels = get_channels_for_quad(quad)
+
+    initial_states, seamTuneNums, failed = prepare_channels(
+        station, channels, max_tries, exclude_channels, selected_channels)
+
+    return tune_seam_and_slow(
+        station, channels, initial_states, seamTuneNums, failed, quad=quad, frequency=frequency,
+        max_tries=max_tries, external_signal=external_signal, tune_with_rolling_mean=tune_with_rolling_mean,
+        tune_with_mean=tune_with_mean, strategy=strategy)
+
+
+def prepare_channels(station, channels, max_tries=50, exclude_channels=[], selected_channels=[]):
+    """
+    Sets up the channels and tunes their SSPin widths (all channels simultaneously).
+
+    This does not need the calibration signal, i.e., the channels of all quads can be
+    prepared at once before tuning the seam and slow samples with `tune_seam_and_slow`.
+
+    Returns
+    -------
+
+    initial_states : list of dicts
+        The calibration specifics of the channels before tuning.
+
+    seamTuneNums : list
+        The register used to tune the seam of each channel. None for channels which are not tuned.
+
+    failed : np.array of bools
+        Whether a channel is not tuned (not selected or failed).
     """
     TRY_REG_3_FOR_FAILED_DLL = True
 
+    _, _, target_width, *_ = get_station_information(station)
+
+    initial_states, seamTuneNums = select_channels(station, channels, exclude_channels, selected_channels)
+    # Exclude channels based on setup or configuration
+    failed = np.array([n is None for n in seamTuneNums])
+
+    for ch_idx, channel in enumerate(channels):
+        # channels which were selected but failed the setup
+        if failed[ch_idx] and channel in selected_channels and channel not in exclude_channels:
+            restore_inital_state(station, channel, initial_states[ch_idx])
+
+    indices = [ch_idx for ch_idx in range(len(channels)) if not failed[ch_idx]]
+    if len(indices):
+        passed, tune_nums = tune_widths(
+            station, [channels[ch_idx] for ch_idx in indices], [seamTuneNums[ch_idx] for ch_idx in indices],
+            target_width, max_tries, TRY_REG_3_FOR_FAILED_DLL)
+
+        for ch_idx, ok, tune_num in zip(indices, passed, tune_nums):
+            seamTuneNums[ch_idx] = tune_num
+            if not ok:
+                restore_inital_state(station, channels[ch_idx], initial_states[ch_idx])
+                failed[ch_idx] = True
+
+    return initial_states, seamTuneNums, failed
+
+
+def tune_seam_and_slow(station, channels, initial_states, seamTuneNums, failed, quad=None, frequency=510,
+                       max_tries=50, external_signal=False, tune_with_rolling_mean=False, tune_with_mean=False,
+                       strategy="heuristic"):
+    """
+    Tunes the seam and slow samples of (prepared) channels, see `prepare_channels`.
+
+    All channels share one timing acquisition (`get_time_run`) per iteration. Without
+    `external_signal` the calibration signal is routed to `quad`, hence all channels have
+    to belong to this quad. With `external_signal` the channels of all quads can be tuned
+    together.
+
+    With `strategy="secant"` the register steps are estimated from the response of the
+    sample times to the previous steps (see `secant_step`) instead of the fixed (heuristic)
+    step sizes. The heuristic is used as long as there is not enough history.
+
+    Returns
+    -------
+
+    channels : list of ints
+        List of all channel which were tuned.
+
+    passed : list of bools
+        List of whether a channel was tuned successful.
+    """
     sample_rate, nom_sample, target_width, seam_slow_factor, seam_fast_factor, \
         slow_slow_factor, slow_fast_factor, mean_slow_factor, mean_fast_factor = \
         get_station_information(station)
@@ -472,11 +648,17 @@ def initial_tune(station, quad, frequency=510, max_tries=50, bad_lab=False, exte
     def slow_in_range(samples):
         return np.all([slow_fast_factor * nom_sample < samples, samples < slow_slow_factor * nom_sample])
 
-    channels = get_channels_for_quad(quad)
+    if strategy not in ["heuristic", "secant"]:
+        raise ValueError(f"Unknown tuning strategy: {strategy}")
 
-    initial_states, seamTuneNums = select_channels(station, channels, exclude_channels, selected_channels)
-    # Exclude channels based on setup or configuration
-    failed = np.array([n is None for n in seamTuneNums])
+    failed = np.array(failed)
+
+    # (register, sample time) pairs of each channel, only used with the secant strategy
+    def new_histories():
+        return {channel: [] if strategy == "secant" else None for channel in channels}
+
+    seam_histories = new_histories()
+    slow_histories = new_histories()
 
     tmp_channels = [c for c, f in zip(channels, failed) if not f]
     logger.info(
@@ -484,24 +666,7 @@ def initial_tune(station, quad, frequency=510, max_tries=50, bad_lab=False, exte
         f"(nominal sample length: {nom_sample:.2f} ps)"
     )
 
-    # stop here if no channel got selected
-    if np.all(failed):
-        return channels, [False] * len(channels)
-
-    for ch_idx, channel in enumerate(channels):
-        if not failed[ch_idx]:
-            curTry, seamTuneNums[ch_idx] = tuned_width(
-                station, channel, target_width, max_tries, seamTuneNums[ch_idx], TRY_REG_3_FOR_FAILED_DLL)
-        else:
-            # this check is only here necessary
-            if ch_idx in selected_channels and ch_idx not in exclude_channels:
-                restore_inital_state(station, channel, initial_states[ch_idx])
-            continue
-
-        if curTry == max_tries:
-            restore_inital_state(station, channel, initial_states[ch_idx])
-            failed[ch_idx] = True
-
+    # stop here if no channel got selected (or all failed)
     if np.all(failed):
         return channels, [False] * len(channels)
 
@@ -517,9 +682,10 @@ def initial_tune(station, quad, frequency=510, max_tries=50, bad_lab=False, exte
     else:
         station.radiant_calselect(quad=None)
 
+    current_states = station.radiant_low_level_interface.calibration_specifics_get_all(channels)
     oldavgs = []
     for ch_idx, channel in enumerate(channels):
-        current_state = station.radiant_low_level_interface.calibration_specifics_get(channel)
+        current_state = current_states[channel]
         # only changes the middle samples... hence not 128
         oldavg = np.sum([current_state[i] for i in range(257, 383)]) / 126  # current_state is a dict
         oldavgs.append(oldavg)
@@ -548,35 +714,40 @@ def initial_tune(station, quad, frequency=510, max_tries=50, bad_lab=False, exte
 
         while not mean_in_range(meanSample[needs_tuning]):
             logger.info(f"Iteration {curTry} / {max_tries}")
-            for ch_idx, channel in enumerate(channels):
-
-                # for ch_idx in range(len(channels)):
-                #     if needs_tuning[ch_idx] and curTry > 5:
-                #         if not 100 < meanSample[ch_idx] < 700:
-                #             logger.error(f"LAB{channels[ch_idx]:<2}: mean far off ({meanSample[ch_idx]}) "
-                #                          "even after 5 iterations. Abort ...")
-                #             needs_tuning[ch_idx] = False
-                #             failed[ch_idx] = True
-
-                if curTry == max_tries and needs_tuning[ch_idx]:
-                    restore_inital_state(station, channel, initial_states[ch_idx])
-                    failed[ch_idx] = True
-                    needs_tuning[ch_idx] = False  # stop here!
-
-                if mean_in_range(meanSample[ch_idx]) or not needs_tuning[ch_idx]:
-                    if needs_tuning[ch_idx]:
-                        # print that only once
-                        logger.info(f"-----> LAB{channel} tuned mean: {meanSample[ch_idx]:.2f} ps")
-
-                    needs_tuning[ch_idx] = False  # this means: Once it was in range it will not be updated anymore
-                    continue  # this channel is already in range, skip it
-
-                # Channel which are tuned already should not be adjusted further.
-                if not needs_tuning[ch_idx]:
-                    continue
-
-                adjust_seam(meanSample[ch_idx], station, channel, nom_sample, seamTuneNums[ch_idx], mode="mean")
-                station.radiant_low_level_interface.lab4d_controller_update(channel)
+            current_states = station.radiant_low_level_interface.calibration_specifics_get_all(
+                np.array(channels)[needs_tuning].tolist())
+            # all trim updates of this iteration are sent in one message
+            with station.rc.batch():
+                for ch_idx, channel in enumerate(channels):
+
+                    # for ch_idx in range(len(channels)):
+                    #     if needs_tuning[ch_idx] and curTry > 5:
+                    #         if not 100 < meanSample[ch_idx] < 700:
+                    #             logger.error(f"LAB{channels[ch_idx]:<2}: mean far off ({meanSample[ch_idx]}) "
+                    #                          "even after 5 iterations. Abort ...")
+                    #             needs_tuning[ch_idx] = False
+                    #             failed[ch_idx] = True
+
+                    if curTry == max_tries and needs_tuning[ch_idx]:
+                        restore_inital_state(station, channel, initial_states[ch_idx])
+                        failed[ch_idx] = True
+                        needs_tuning[ch_idx] = False  # stop here!
+
+                    if mean_in_range(meanSample[ch_idx]) or not needs_tuning[ch_idx]:
+                        if needs_tuning[ch_idx]:
+                            # print that only once
+                            logger.info(f"-----> LAB{channel} tuned mean: {meanSample[ch_idx]:.2f} ps")
+
+                        needs_tuning[ch_idx] = False  # this means: Once it was in range it will not be updated anymore
+                        continue  # this channel is already in range, skip it
+
+                    # Channel which are tuned already should not be adjusted further.
+                    if not needs_tuning[ch_idx]:
+                        continue
+
+                    adjust_seam(meanSample[ch_idx], station, channel, nom_sample, seamTuneNums[ch_idx], mode="mean",
+                                current_state=current_states[channel], history=seam_histories[channel])
+                    station.radiant_low_level_interface.lab4d_controller_update(channel)
 
             if not np.any(needs_tuning):
                 break
@@ -602,6 +773,7 @@ def initial_tune(station, quad, frequency=510, max_tries=50, bad_lab=False, exte
     bouncing = [0] * len(channels)
     tune_mode = "seam"  # default
     curTry = 0  # reset
+    seam_histories = new_histories()  # forget the mean tuning
 
     logger.info(f"Optimizing seam / slow. Target range is "
                  f"[{nom_sample * seam_fast_factor:.2f}, {nom_sample * seam_slow_factor:.2f}] ps / "
@@ -619,78 +791,90 @@ def initial_tune(station, quad, frequency=510, max_tries=50, bad_lab=False, exte
         for channel, seam in zip(np.array(channels)[needs_tuning], seamSamples[needs_tuning]):
             logger.debug(f"LAB{channel:<2}: current seam samples: {seam}")
 
-        for ch_idx, channel in enumerate(channels):
+        current_states = station.radiant_low_level_interface.calibration_specifics_get_all(
+            np.array(channels)[needs_tuning].tolist())
 
-            if curTry >= max_tries and needs_tuning[ch_idx]:
-                restore_inital_state(station, channel, initial_states[ch_idx])
-                failed[ch_idx] = True
-                needs_tuning[ch_idx] = False  # stop here!
-
-            if seam_in_range(seamSamples[ch_idx]) and slow_in_range(slowSample[ch_idx]) and not (tune_with_rolling_mean and curTry < 5):
-                if needs_tuning[ch_idx]:
-                    # print that only once
-                    logger.info(f"-----> LAB{channel} tuned: {np.mean(seamSamples, axis=-1)[ch_idx]:.2f} / {slowSample[ch_idx]:.2f} ps")
-                    if tune_with_rolling_mean:
-                        logger.info(f"-----> The last 5 seam samples were: {seamSamples[ch_idx]} ps")
-                else:
-                    logger.debug(f"-----> LAB{channel} still in range: {np.mean(seamSamples, axis=-1)[ch_idx]:.2f} / {slowSample[ch_idx]:.2f} ps")
-
-                needs_tuning[ch_idx] = False  # this means: Once it was in range it will not be updated anymore
-
-            elif not needs_tuning[ch_idx]:
-                # Unless this channel faild in before this while loop it dropped out of range after
-                # is was in range
-                logger.debug(f"-----> LAB{channel} (probably) out of range again: "
-                             f"{np.mean(seamSamples, axis=-1)[ch_idx]:.2f} / {slowSample[ch_idx]:.2f} ps")
-
-            if not needs_tuning[ch_idx]:
-                continue
-
-            if bouncing[ch_idx]:
-                logger.info(f"LAB{channels[ch_idx]:<2}: Bouncing {bouncing[ch_idx]} "
-                            f"(seam in range: {seam_in_range(seamSample[ch_idx])}) "
-                            f"(slow in range: {slow_in_range(slowSample[ch_idx])})")
-
-            # Fix the seam if it's gone off too much. Here use seamSample (i.e. the last one only!)
-            if not seam_in_range(seamSample[ch_idx]) and bouncing[ch_idx] < 3:
-
-                logger.debug(f"LAB{channel} SEAM off")
-                adjust_seam(seamSample[ch_idx], station, channel, nom_sample,
-                            seamTuneNums[ch_idx], mode=tune_mode)
-
-                if (last_seam[ch_idx] > nom_sample * seam_slow_factor
-                        and seamSample[ch_idx] < nom_sample * seam_fast_factor):
-                    bouncing[ch_idx] += 1
-
-                elif (last_seam[ch_idx] < nom_sample * seam_fast_factor
-                        and seamSample[ch_idx] > nom_sample * seam_slow_factor):
-                    bouncing[ch_idx] += 1
-
-                last_seam = copy.deepcopy(seamSample)
-                if bouncing[ch_idx] > 3:
-                    logger.warning("Bouncing")
-
-            elif not slow_in_range(slowSample[ch_idx]):
-
-                logger.debug(f"LAB{channel} SLOW off")
-
-                # We ONLY DO THIS if the seam sample's close.
-                # This is because the slow sample changes with the seam timing like
-                # everything else (actually a little more)
-                #
-                # So now, we're trying to find a *global* starting point where
-                # the slow sample is *too fast*. Because slowing it down is easy!
-                # So to do that, we slow everyone else down. Doing that means the
-                # the DLL portion speeds up, so the slow sample speeds up as well.
-                # This slows down trims 1->126 by adding 25 to them.
-                # Remember trim 127 is the slow sample, and trim 0 is the multichannel clock alignment trim.
-
-                # Trim updating is a pain, sigh.
-                oldavgs[ch_idx] = adjust_slow(slowSample[ch_idx], slow_step, station, channel, nom_sample,
-                                    slow_slow_factor, slow_fast_factor)
-                bouncing[ch_idx] = 0
+        # all trim updates of this iteration are sent in one message
+        with station.rc.batch():
+            for ch_idx, channel in enumerate(channels):
 
-            station.radiant_low_level_interface.lab4d_controller_update(channel)
+                if curTry >= max_tries and needs_tuning[ch_idx]:
+                    restore_inital_state(station, channel, initial_states[ch_idx])
+                    failed[ch_idx] = True
+                    needs_tuning[ch_idx] = False  # stop here!
+
+                if seam_in_range(seamSamples[ch_idx]) and slow_in_range(slowSample[ch_idx]) and not (tune_with_rolling_mean and curTry < 5):
+                    if needs_tuning[ch_idx]:
+                        # print that only once
+                        logger.info(f"-----> LAB{channel} tuned: {np.mean(seamSamples, axis=-1)[ch_idx]:.2f} / {slowSample[ch_idx]:.2f} ps")
+                        if tune_with_rolling_mean:
+                            logger.info(f"-----> The last 5 seam samples were: {seamSamples[ch_idx]} ps")
+                    else:
+                        logger.debug(f"-----> LAB{channel} still in range: {np.mean(seamSamples, axis=-1)[ch_idx]:.2f} / {slowSample[ch_idx]:.2f} ps")
+
+                    needs_tuning[ch_idx] = False  # this means: Once it was in range it will not be updated anymore
+
+                elif not needs_tuning[ch_idx]:
+                    # Unless this channel faild in before this while loop it dropped out of range after
+                    # is was in range
+                    logger.debug(f"-----> LAB{channel} (probably) out of range again: "
+                                 f"{np.mean(seamSamples, axis=-1)[ch_idx]:.2f} / {slowSample[ch_idx]:.2f} ps")
+
+                if not needs_tuning[ch_idx]:
+                    continue
+
+                if bouncing[ch_idx]:
+                    logger.info(f"LAB{channels[ch_idx]:<2}: Bouncing {bouncing[ch_idx]} "
+                                f"(seam in range: {seam_in_range(seamSample[ch_idx])}) "
+                                f"(slow in range: {slow_in_range(slowSample[ch_idx])})")
+
+                # Fix the seam if it's gone off too much. Here use seamSample (i.e. the last one only!)
+                if not seam_in_range(seamSample[ch_idx]) and bouncing[ch_idx] < 3:
+
+                    logger.debug(f"LAB{channel} SEAM off")
+                    adjust_seam(seamSample[ch_idx], station, channel, nom_sample,
+                                seamTuneNums[ch_idx], mode=tune_mode, current_state=current_states[channel],
+                                history=seam_histories[channel])
+                    if strategy == "secant":
+                        slow_histories[channel].clear()  # the slow sample also changed
+
+                    if (last_seam[ch_idx] > nom_sample * seam_slow_factor
+                            and seamSample[ch_idx] < nom_sample * seam_fast_factor):
+                        bouncing[ch_idx] += 1
+
+                    elif (last_seam[ch_idx] < nom_sample * seam_fast_factor
+                            and seamSample[ch_idx] > nom_sample * seam_slow_factor):
+                        bouncing[ch_idx] += 1
+
+                    last_seam = copy.deepcopy(seamSample)
+                    if bouncing[ch_idx] > 3:
+                        logger.warning("Bouncing")
+
+                elif not slow_in_range(slowSample[ch_idx]):
+
+                    logger.debug(f"LAB{channel} SLOW off")
+
+                    # We ONLY DO THIS if the seam sample's close.
+                    # This is because the slow sample changes with the seam timing like
+                    # everything else (actually a little more)
+                    #
+                    # So now, we're trying to find a *global* starting point where
+                    # the slow sample is *too fast*. Because slowing it down is easy!
+                    # So to do that, we slow everyone else down. Doing that means the
+                    # the DLL portion speeds up, so the slow sample speeds up as well.
+                    # This slows down trims 1->126 by adding 25 to them.
+                    # Remember trim 127 is the slow sample, and trim 0 is the multichannel clock alignment trim.
+
+                    # Trim updating is a pain, sigh.
+                    oldavgs[ch_idx] = adjust_slow(slowSample[ch_idx], slow_step, station, channel, nom_sample,
+                                                  slow_slow_factor, slow_fast_factor,
+                                                  current_state=current_states[channel],
+                                                  history=slow_histories[channel])
+                    if strategy == "secant":
+                        seam_histories[channel].clear()  # the seam sample also changed
+                    bouncing[ch_idx] = 0
+
+                station.radiant_low_level_interface.lab4d_controller_update(channel)
 
         if not np.any(needs_tuning):
             break
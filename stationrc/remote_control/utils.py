@@ -84,6 +84,16 @@ def convert_alias_to_ip(host):
     return host
 
 
+def get_station_hosts():
+    """ Returns a dict with one alias per station (the first one in `host_aliases`) and its ip (without localhost). """
+    hosts = {}
+    for alias, ip in host_aliases.items():
+        if ip != "127.0.0.1" and ip not in hosts.values():
+            hosts[alias] = ip
+
+    return hosts
+
+
 def get_channels_for_quad(quad):
     if quad == 0:
         return [0, 1, 2, 3, 12, 13, 14, 15]